@@ -8,9 +8,10 @@ import re
 import subprocess
 import time
 import uuid
+from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
 
 import anthropic
 from PIL import Image
@@ -24,8 +25,9 @@ from fl_state import (
     resolve_reference_images,
 )
 from fl_visual_judge import VisualJudgeResult, judge_fl_visual
+import json_compat
 from learning import generate_lessons, load_relevant_lessons, store_lessons
-from memory import ensure_session, write_event, write_metrics
+from memory import EventWriter, ensure_session, write_event, write_metrics
 from run_eval import evaluate_drum_run
 from self_improve import (
     SkillUpdate,
@@ -88,11 +90,49 @@ def build_system_prompt(*, tool_api_type: str) -> str:
 
 PROMPT_CACHING_BETA_FLAG = "prompt-caching-2024-07-31"
 READ_SKILL_TOOL_NAME = "read_skill"
-NON_PRODUCTIVE_ACTIONS = {"zoom", "mouse_move"}
-RESET_NON_PRODUCTIVE_ACTIONS = {"left_click", "key"}
+NON_PRODUCTIVE_ACTIONS = frozenset({"zoom", "mouse_move"})
+RESET_NON_PRODUCTIVE_ACTIONS = frozenset({"left_click", "key"})
 MAX_SAME_STEP_RETRIES = 2
 LLM_BACKENDS = ("anthropic", "claude_print")
 DEFAULT_LLM_BACKEND = "anthropic"
+USAGE_TAIL_SIZE = 5
+# metrics["usage_totals"] key -> Anthropic usage field.
+USAGE_TOTAL_FIELDS = (
+    ("input", "input_tokens"),
+    ("output", "output_tokens"),
+    ("cache_read", "cache_read_input_tokens"),
+    ("cache_write", "cache_creation_input_tokens"),
+)
+
+# Constant across runs so the reflection call can reuse a cached prefix.
+REFLECTION_SYSTEM_TEXT = (
+    "You are PostTaskHook for autonomous skill maintenance.\n"
+    "Given task + tool trace + screenshots + current skills + reference docs, propose grounded updates.\n"
+    "Return STRICT JSON only:\n"
+    "{\n"
+    '  "confidence": 0.0,\n'
+    '  "skill_updates": [\n'
+    "    {\n"
+    '      "skill_ref": "...",\n'
+    '      "skill_digest": "...",\n'
+    '      "root_cause": "...",\n'
+    '      "evidence_steps": [5, 8],\n'
+    '      "replace_rules": [{"find":"...","replace":"..."}],\n'
+    '      "append_bullets": ["..."]\n'
+    "    }\n"
+    "  ]\n"
+    "}\n"
+    "Rules:\n"
+    "- Prefer fixing/rewriting weak existing rules via replace_rules before appending new bullets.\n"
+    "- Every update must include concrete root_cause and evidence_steps from provided events.\n"
+    "- Every update must include exact skill_digest for the skill snapshot.\n"
+    "- Do not repeat guidance already present in the skill.\n"
+    "- Prefer generic reusable lessons over one-off coordinates, unless coordinates expose a repeated failure pattern.\n"
+    "- Use DETERMINISTIC_EVAL as the primary failure signal. If eval says passed=true, return no updates.\n"
+    "- Use screenshot evidence and reference docs to justify root cause and proposed rules.\n"
+    "- Max 2 skills, max 3 bullets per skill.\n"
+    "- Do not propose updates if signal is weak.\n"
+)
 
 
 def _read_skill_tool_param() -> dict[str, Any]:
@@ -116,35 +156,53 @@ def _read_skill_tool_param() -> dict[str, Any]:
     }
 
 
-def _inject_prompt_caching(messages: list[dict[str, Any]], *, breakpoints: int = 3) -> None:
+def _inject_prompt_caching(
+    messages: list[dict[str, Any]],
+    *,
+    breakpoints: int = 3,
+    user_indices: Iterable[int] | None = None,
+) -> None:
     """
     Put cache breakpoints on the most recent user turns so repeated loops are cheap.
     Mirrors Anthropic quickstart behavior.
+
+    `user_indices` are positions of user turns in `messages`, oldest first. The
+    run loop tracks them as it appends turns so this is index math, not a scan.
     """
-    remaining = breakpoints
-    for msg in reversed(messages):
-        if msg.get("role") != "user":
-            continue
-        content = msg.get("content")
-        if not isinstance(content, list) or not content:
-            continue
-        if remaining > 0:
-            remaining -= 1
-            last = content[-1]
-            if isinstance(last, dict):
-                last["cache_control"] = {"type": "ephemeral"}
-        else:
-            last = content[-1]
-            if isinstance(last, dict) and "cache_control" in last:
-                del last["cache_control"]
-            break
+    if user_indices is None:
+        user_indices = [
+            i
+            for i, msg in enumerate(messages)
+            if msg.get("role") == "user" and isinstance(msg.get("content"), list) and msg.get("content")
+        ]
+    recent = list(user_indices)[-(breakpoints + 1) :]
+    if len(recent) > breakpoints:
+        # The turn that just slid out of the window drops its breakpoint.
+        messages[recent.pop(0)]["content"][-1].pop("cache_control", None)
+    for i in recent:
+        messages[i]["content"][-1]["cache_control"] = {"type": "ephemeral"}
+
+
+def _accumulate_usage(totals: dict[str, int], usage: dict[str, Any]) -> None:
+    """
+    Fold one response's usage into running counters.
+
+    Keeps metrics O(1) in run length instead of storing every usage payload.
+    """
+    for key, field in USAGE_TOTAL_FIELDS:
+        value = usage.get(field)
+        if isinstance(value, int) and not isinstance(value, bool):
+            totals[key] += value
 
 
 def _tool_result_block(tool_use_id: str, result: ToolResult) -> dict[str, Any]:
     content: list[dict[str, Any]] = []
-    if result.output:
+    if result.output and result.error:
+        # One text block instead of two keeps framing tokens down.
+        content.append({"type": "text", "text": f"{result.output}\nERROR: {result.error}"})
+    elif result.output:
         content.append({"type": "text", "text": result.output})
-    if result.error:
+    elif result.error:
         content.append({"type": "text", "text": result.error})
     if result.base64_image_png:
         content.append(
@@ -500,9 +558,11 @@ def _create_executor_response_via_claude_print(
     return assistant_blocks, usage_payload
 
 
-def _save_png_b64(session_dir: Path, *, name: str, b64: str) -> Path:
-    out = session_dir / name
-    out.write_bytes(base64.b64decode(b64))
+def _save_png_b64(session_dir: str, *, name: str, b64: str) -> str:
+    # Plain string paths: this runs once per tool call and the result goes straight into events.
+    out = f"{session_dir}/{name}"
+    with open(out, "wb") as f:
+        f.write(base64.b64decode(b64))
     return out
 
 
@@ -577,7 +637,7 @@ def _read_session_events(events_path: Path) -> list[dict[str, Any]]:
         return events
     for line in lines:
         try:
-            parsed = json.loads(line)
+            parsed = json_compat.loads(line)
         except Exception:
             continue
         if isinstance(parsed, dict):
@@ -719,9 +779,11 @@ def run_agent(
         display_width_px=cfg.display_width_px,
         display_height_px=cfg.display_height_px,
         enable_zoom=(computer_api_type == "computer_20251124"),
+        png_compress_level=cfg.png_compress_level,
     )
 
     paths = ensure_session(session_id)
+    session_dir_str = str(paths.session_dir)
 
     messages: list[dict[str, Any]] = [
         {
@@ -785,6 +847,9 @@ def run_agent(
     # breakpoints must be capped to keep requests valid.
     system_cache_blocks = int("cache_control" in skills_system_block) + int("cache_control" in lessons_system_block)
     user_cache_breakpoints = max(0, 4 - system_cache_blocks)
+    # Positions of user turns; only the newest window (+1 to clear the turn
+    # sliding out) matters for caching. Index 0 is the task turn.
+    user_turn_indices: deque[int] = deque([0], maxlen=user_cache_breakpoints + 1)
     # Reduce screenshot/tool payload overhead when supported.
     # If unsupported by the model, the API will 400; we'll disable if that happens.
     betas.append(cfg.token_efficient_tools_beta)
@@ -826,37 +891,49 @@ def run_agent(
         "judge_reasons": [],
         "judge_reference_images": [],
         "judge_observed_steps": [],
-        "usage": [],
+        "usage_totals": {key: 0 for key, _ in USAGE_TOTAL_FIELDS},
+        "usage_tail": [],
     }
+    usage_tail: deque[dict[str, Any]] = deque(maxlen=USAGE_TAIL_SIZE)
     # Hard guardrail for Opus path: stop inspection loops and force decisive actions.
     non_productive_streak = 0
     loop_guard_enabled = computer_api_type == "computer_20251124"
     read_skill_refs: set[str] = set()
 
+    # Per-run invariants: resolve these once instead of re-testing them every step.
+    use_anthropic = llm_backend == "anthropic"
+    inject_caching = cfg.enable_prompt_caching and use_anthropic
+    guarded_actions = NON_PRODUCTIVE_ACTIONS if loop_guard_enabled else frozenset()
+    if allowed_actions is not None:
+        allowed = frozenset(allowed_actions)
+
+        def run_computer_action(tool_in: dict[str, Any]) -> ToolResult:
+            action = tool_in.get("action")
+            if not isinstance(action, str) or action not in allowed:
+                return ToolResult(error=f"Action not allowed in this run: {action!r}")
+            return computer.run(tool_in)
+
+    else:
+        run_computer_action = computer.run
+
     step = 1
     same_step_retries = 0
-    while step <= max_steps:
-        metrics["steps"] = step
-        if cfg.enable_prompt_caching and llm_backend == "anthropic":
-            _inject_prompt_caching(messages, breakpoints=user_cache_breakpoints)
-
-        if llm_backend == "anthropic":
-            if client is None:
-                raise RuntimeError("Anthropic client unavailable while llm_backend=anthropic.")
-            try:
-                resp = client.beta.messages.create(
-                    model=model,
-                    max_tokens=2048,
-                    system=system_blocks,
-                    tools=tools,
-                    messages=messages,
-                    betas=betas,
+    # Closing in __exit__ flushes buffered events (and stops the computer tool's
+    # encode workers) even when the loop raises.
+    with EventWriter(paths.jsonl_path) as event_log, computer:
+        while step <= max_steps:
+            metrics["steps"] = step
+            if inject_caching:
+                _inject_prompt_caching(
+                    messages,
+                    breakpoints=user_cache_breakpoints,
+                    user_indices=user_turn_indices,
                 )
-            except anthropic.BadRequestError as e:
-                # If the token-efficient-tools beta isn't supported, retry once without it.
-                msg = str(getattr(e, "message", "")) + " " + str(getattr(e, "body", ""))
-                if cfg.token_efficient_tools_beta in msg and cfg.token_efficient_tools_beta in betas:
-                    betas = [b for b in betas if b != cfg.token_efficient_tools_beta]
+
+            if use_anthropic:
+                if client is None:
+                    raise RuntimeError("Anthropic client unavailable while llm_backend=anthropic.")
+                try:
                     resp = client.beta.messages.create(
                         model=model,
                         max_tokens=2048,
@@ -865,161 +942,172 @@ def run_agent(
                         messages=messages,
                         betas=betas,
                     )
-                else:
-                    raise
-
-            # Usage accounting (incl. prompt caching fields when enabled)
-            try:
-                usage = resp.usage.model_dump()  # type: ignore[attr-defined]
-            except Exception:
-                usage = getattr(resp, "usage", None)
-                usage = usage.model_dump() if usage is not None and hasattr(usage, "model_dump") else {}
-            assistant_blocks = [b.model_dump() for b in resp.content]  # type: ignore[attr-defined]
-        else:
-            assistant_blocks, usage = _create_executor_response_via_claude_print(
-                model=model,
-                system_blocks=system_blocks,
-                tools=tools,
-                messages=messages,
-            )
-        metrics["usage"].append(usage)
-        messages.append({"role": "assistant", "content": assistant_blocks})
+                except anthropic.BadRequestError as e:
+                    # If the token-efficient-tools beta isn't supported, retry once without it.
+                    msg = str(getattr(e, "message", "")) + " " + str(getattr(e, "body", ""))
+                    if cfg.token_efficient_tools_beta in msg and cfg.token_efficient_tools_beta in betas:
+                        betas = [b for b in betas if b != cfg.token_efficient_tools_beta]
+                        resp = client.beta.messages.create(
+                            model=model,
+                            max_tokens=2048,
+                            system=system_blocks,
+                            tools=tools,
+                            messages=messages,
+                            betas=betas,
+                        )
+                    else:
+                        raise
 
-        tool_results: list[dict[str, Any]] = []
-        retry_same_step = False
-        decisive_action_succeeded = False
+                # Usage accounting (incl. prompt caching fields when enabled)
+                try:
+                    usage = resp.usage.model_dump()  # type: ignore[attr-defined]
+                except Exception:
+                    usage = getattr(resp, "usage", None)
+                    usage = usage.model_dump() if usage is not None and hasattr(usage, "model_dump") else {}
+                assistant_blocks = [b.model_dump() for b in resp.content]  # type: ignore[attr-defined]
+            else:
+                assistant_blocks, usage = _create_executor_response_via_claude_print(
+                    model=model,
+                    system_blocks=system_blocks,
+                    tools=tools,
+                    messages=messages,
+                )
+            if isinstance(usage, dict):
+                _accumulate_usage(metrics["usage_totals"], usage)
+                usage_tail.append(usage)
+                metrics["usage_tail"] = list(usage_tail)
+            messages.append({"role": "assistant", "content": assistant_blocks})
 
-        for block in assistant_blocks:
-            if not (isinstance(block, dict) and block.get("type") == "tool_use"):
-                continue
-            tool_use_id = block.get("id", "")
-            tool_name = block.get("name", "")
-            tool_input = block.get("input", {})
+            tool_results: list[dict[str, Any]] = []
+            retry_same_step = False
+            decisive_action_succeeded = False
 
-            if tool_name == computer.name:
-                metrics["tool_actions"] += 1
-                try:
-                    tool_in = tool_input if isinstance(tool_input, dict) else {}
-                    action = tool_in.get("action")
-                    if loop_guard_enabled and action in NON_PRODUCTIVE_ACTIONS and non_productive_streak >= 2:
-                        result = ToolResult(
-                            error=(
-                                "Loop guard: too many consecutive zoom/mouse_move actions without progress. "
-                                "Next action must be decisive: left_click or key."
-                            )
-                        )
-                        metrics["loop_guard_blocks"] += 1
-                        retry_same_step = True
-                    elif allowed_actions is not None:
-                        if not isinstance(action, str) or action not in allowed_actions:
-                            result = ToolResult(error=f"Action not allowed in this run: {action!r}")
-                        else:
-                            result = computer.run(tool_in)
-                    else:
-                        result = computer.run(tool_in)
-
-                    if action in NON_PRODUCTIVE_ACTIONS and not result.is_error():
-                        non_productive_streak += 1
-                    elif action in RESET_NON_PRODUCTIVE_ACTIONS and not result.is_error():
-                        non_productive_streak = 0
-                        decisive_action_succeeded = True
-
-                except Exception as e:
-                    # Don't crash the loop on unexpected local tool errors; surface it to the model.
-                    result = ToolResult(error=f"Local tool exception: {type(e).__name__}: {e}")
-                if result.is_error():
-                    metrics["tool_errors"] += 1
-            elif tool_name == EXTRACT_FL_STATE_TOOL_NAME:
-                tool_in = tool_input if isinstance(tool_input, dict) else {}
-                goal = str(tool_in.get("goal", "")).strip()
-                task_hint = str(tool_in.get("task_hint", "")).strip() or task
-                if llm_backend != "anthropic" or client is None:
-                    result = ToolResult(error="extract_fl_state is unavailable when llm_backend=claude_print")
-                    metrics["tool_errors"] += 1
-                else:
+            for block in assistant_blocks:
+                if not (isinstance(block, dict) and block.get("type") == "tool_use"):
+                    continue
+                tool_use_id = block.get("id", "")
+                tool_name = block.get("name", "")
+                tool_input = block.get("input", {})
+
+                if tool_name == computer.name:
+                    metrics["tool_actions"] += 1
                     try:
-                        shot = computer.run({"action": "screenshot"})
-                        if shot.is_error() or not shot.base64_image_png:
-                            result = ToolResult(error=shot.error or "extract_fl_state could not capture screenshot")
-                            metrics["tool_errors"] += 1
-                        else:
-                            state = extract_fl_state_from_image(
-                                client=client,
-                                model=cfg.model_decider,
-                                screenshot_b64=shot.base64_image_png,
-                                goal=goal,
-                                task_hint=task_hint,
-                            )
+                        tool_in = tool_input if isinstance(tool_input, dict) else {}
+                        action = tool_in.get("action")
+                        if action in guarded_actions and non_productive_streak >= 2:
                             result = ToolResult(
-                                output=json.dumps(state, ensure_ascii=True),
-                                base64_image_png=shot.base64_image_png,
+                                error=(
+                                    "Loop guard: too many consecutive zoom/mouse_move actions without progress. "
+                                    "Next action must be decisive: left_click or key."
+                                )
                             )
+                            metrics["loop_guard_blocks"] += 1
+                            retry_same_step = True
+                        else:
+                            result = run_computer_action(tool_in)
+
+                        if action in NON_PRODUCTIVE_ACTIONS and not result.is_error():
+                            non_productive_streak += 1
+                        elif action in RESET_NON_PRODUCTIVE_ACTIONS and not result.is_error():
+                            non_productive_streak = 0
+                            decisive_action_succeeded = True
+
                     except Exception as e:
-                        result = ToolResult(error=f"extract_fl_state exception: {type(e).__name__}: {e}")
+                        # Don't crash the loop on unexpected local tool errors; surface it to the model.
+                        result = ToolResult(error=f"Local tool exception: {type(e).__name__}: {e}")
+                    if result.is_error():
                         metrics["tool_errors"] += 1
-            elif tool_name == READ_SKILL_TOOL_NAME:
-                metrics["skill_reads"] += 1
-                tool_in = tool_input if isinstance(tool_input, dict) else {}
-                skill_ref = tool_in.get("skill_ref")
-                if not isinstance(skill_ref, str):
-                    result = ToolResult(error=f"read_skill requires string skill_ref, got: {skill_ref!r}")
-                    metrics["tool_errors"] += 1
-                else:
-                    content, err = resolve_skill_content(skill_manifest_entries, skill_ref)
-                    if err:
-                        result = ToolResult(error=err)
+                elif tool_name == EXTRACT_FL_STATE_TOOL_NAME:
+                    tool_in = tool_input if isinstance(tool_input, dict) else {}
+                    goal = str(tool_in.get("goal", "")).strip()
+                    task_hint = str(tool_in.get("task_hint", "")).strip() or task
+                    if not use_anthropic or client is None:
+                        result = ToolResult(error="extract_fl_state is unavailable when llm_backend=claude_print")
                         metrics["tool_errors"] += 1
                     else:
-                        read_skill_refs.add(skill_ref)
-                        result = ToolResult(output=f"skill_ref: {skill_ref}\n\n{content}")
-            else:
-                result = ToolResult(error=f"Unknown tool requested: {tool_name!r}")
-
-            if result.base64_image_png:
-                img_path = _save_png_b64(paths.session_dir, name=f"step-{step:03d}.png", b64=result.base64_image_png)
-            else:
-                img_path = None
+                        try:
+                            shot = computer.run({"action": "screenshot"})
+                            if shot.is_error() or not shot.base64_image_png:
+                                result = ToolResult(error=shot.error or "extract_fl_state could not capture screenshot")
+                                metrics["tool_errors"] += 1
+                            else:
+                                state = extract_fl_state_from_image(
+                                    client=client,
+                                    model=cfg.model_decider,
+                                    screenshot_b64=shot.base64_image_png,
+                                    goal=goal,
+                                    task_hint=task_hint,
+                                )
+                                result = ToolResult(
+                                    output=json.dumps(state, ensure_ascii=True),
+                                    base64_image_png=shot.base64_image_png,
+                                )
+                        except Exception as e:
+                            result = ToolResult(error=f"extract_fl_state exception: {type(e).__name__}: {e}")
+                            metrics["tool_errors"] += 1
+                elif tool_name == READ_SKILL_TOOL_NAME:
+                    metrics["skill_reads"] += 1
+                    tool_in = tool_input if isinstance(tool_input, dict) else {}
+                    skill_ref = tool_in.get("skill_ref")
+                    if not isinstance(skill_ref, str):
+                        result = ToolResult(error=f"read_skill requires string skill_ref, got: {skill_ref!r}")
+                        metrics["tool_errors"] += 1
+                    else:
+                        content, err = resolve_skill_content(skill_manifest_entries, skill_ref)
+                        if err:
+                            result = ToolResult(error=err)
+                            metrics["tool_errors"] += 1
+                        else:
+                            read_skill_refs.add(skill_ref)
+                            result = ToolResult(output=f"skill_ref: {skill_ref}\n\n{content}")
+                else:
+                    result = ToolResult(error=f"Unknown tool requested: {tool_name!r}")
 
-            write_event(
-                paths.jsonl_path,
-                {
-                    "step": step,
-                    "tool": tool_name,
-                    "tool_input": tool_input,
-                    "ok": not result.is_error(),
-                    "error": result.error,
-                    "output": result.output,
-                    "screenshot": str(img_path) if img_path else None,
-                    "usage": usage,
-                },
-            )
+                if result.base64_image_png:
+                    img_path = _save_png_b64(session_dir_str, name=f"step-{step:03d}.png", b64=result.base64_image_png)
+                else:
+                    img_path = None
 
-            if verbose:
-                action = tool_input.get("action") if isinstance(tool_input, dict) else None
-                print(
-                    f"[step {step:03d}] tool={tool_name} action={action!r} ok={not result.is_error()} error={result.error!r}",
-                    flush=True,
+                event_log.write(
+                    {
+                        "step": step,
+                        "tool": tool_name,
+                        "tool_input": tool_input,
+                        "ok": not result.is_error(),
+                        "error": result.error,
+                        "output": result.output,
+                        "screenshot": img_path,
+                        "usage": usage,
+                    },
                 )
 
-            tool_results.append(_tool_result_block(tool_use_id, result))
-
-        if not tool_results:
-            # No tool calls => model claims it's done / can't proceed.
-            if verbose:
-                print(f"[step {step:03d}] no tool call; model stopped.", flush=True)
-            break
-
-        messages.append({"role": "user", "content": tool_results})
-        if retry_same_step and not decisive_action_succeeded and same_step_retries < MAX_SAME_STEP_RETRIES:
-            same_step_retries += 1
-            if verbose:
-                print(
-                    f"[step {step:03d}] governor retry without step burn ({same_step_retries}/{MAX_SAME_STEP_RETRIES})",
-                    flush=True,
-                )
-            continue
-        same_step_retries = 0
-        step += 1
+                if verbose:
+                    action = tool_input.get("action") if isinstance(tool_input, dict) else None
+                    print(
+                        f"[step {step:03d}] tool={tool_name} action={action!r} ok={not result.is_error()} error={result.error!r}",
+                        flush=True,
+                    )
+
+                tool_results.append(_tool_result_block(tool_use_id, result))
+
+            if not tool_results:
+                # No tool calls => model claims it's done / can't proceed.
+                if verbose:
+                    print(f"[step {step:03d}] no tool call; model stopped.", flush=True)
+                break
+
+            user_turn_indices.append(len(messages))
+            messages.append({"role": "user", "content": tool_results})
+            if retry_same_step and not decisive_action_succeeded and same_step_retries < MAX_SAME_STEP_RETRIES:
+                same_step_retries += 1
+                if verbose:
+                    print(
+                        f"[step {step:03d}] governor retry without step burn ({same_step_retries}/{MAX_SAME_STEP_RETRIES})",
+                        flush=True,
+                    )
+                continue
+            same_step_retries = 0
+            step += 1
 
     # End-of-run evaluation: deterministic contract + independent visual judge.
     all_events: list[dict[str, Any]] = _read_session_events(paths.jsonl_path)
@@ -1182,34 +1270,6 @@ def run_agent(
             skill_texts.append(f"skill_ref: {ref}\nskill_digest: {digest}\n{content}")
 
         reference_doc = _load_fl_reference_snippet()
-        reflection_system = (
-            "You are PostTaskHook for autonomous skill maintenance.\n"
-            "Given task + tool trace + screenshots + current skills + reference docs, propose grounded updates.\n"
-            "Return STRICT JSON only:\n"
-            "{\n"
-            '  "confidence": 0.0,\n'
-            '  "skill_updates": [\n'
-            "    {\n"
-            '      "skill_ref": "...",\n'
-            '      "skill_digest": "...",\n'
-            '      "root_cause": "...",\n'
-            '      "evidence_steps": [5, 8],\n'
-            '      "replace_rules": [{"find":"...","replace":"..."}],\n'
-            '      "append_bullets": ["..."]\n'
-            "    }\n"
-            "  ]\n"
-            "}\n"
-            "Rules:\n"
-            "- Prefer fixing/rewriting weak existing rules via replace_rules before appending new bullets.\n"
-            "- Every update must include concrete root_cause and evidence_steps from provided events.\n"
-            "- Every update must include exact skill_digest for the skill snapshot.\n"
-            "- Do not repeat guidance already present in the skill.\n"
-            "- Prefer generic reusable lessons over one-off coordinates, unless coordinates expose a repeated failure pattern.\n"
-            "- Use DETERMINISTIC_EVAL as the primary failure signal. If eval says passed=true, return no updates.\n"
-            "- Use screenshot evidence and reference docs to justify root cause and proposed rules.\n"
-            "- Max 2 skills, max 3 bullets per skill.\n"
-            "- Do not propose updates if signal is weak.\n"
-        )
         reflection_user = (
             "TASK:\n"
             f"{task}\n\n"
@@ -1229,8 +1289,6 @@ def run_agent(
             f"{json.dumps(sorted(read_skill_refs), ensure_ascii=True)}\n\n"
             "SKILL_DIGESTS:\n"
             f"{json.dumps(skill_digests, ensure_ascii=True)}\n\n"
-            "REFERENCE_DOC_SNIPPET:\n"
-            f"{reference_doc}\n\n"
             "SKILL_CONTENTS:\n"
             + "\n\n".join(skill_texts)
         )
@@ -1250,7 +1308,18 @@ def run_agent(
             else:
                 metrics["lessons_generated"] = 0
 
-            reflection_content: list[dict[str, Any]] = [{"type": "text", "text": reflection_user}]
+            reflection_content: list[dict[str, Any]] = []
+            if reference_doc:
+                # Reference doc is stable across runs: lead with it as its own cached block.
+                reflection_content.append(
+                    {
+                        "type": "text",
+                        "text": f"REFERENCE_DOC_SNIPPET:\n{reference_doc}",
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                )
+            reflection_content.append({"type": "text", "text": reflection_user})
+            screenshots_label_index = len(reflection_content)
             shot_labels: list[str] = []
             for step_id, shot_path in _select_reflection_screenshots(all_events, max_images=3):
                 blk = _image_block_from_file(shot_path)
@@ -1260,7 +1329,7 @@ def run_agent(
                 reflection_content.append(blk)
             if shot_labels:
                 reflection_content.insert(
-                    1,
+                    screenshots_label_index,
                     {
                         "type": "text",
                         "text": "SCREENSHOTS_INCLUDED:\n" + "\n".join(shot_labels),
@@ -1270,7 +1339,13 @@ def run_agent(
             reflection = client.messages.create(
                 model=cfg.model_critic,
                 max_tokens=700,
-                system=reflection_system,
+                system=[
+                    {
+                        "type": "text",
+                        "text": REFLECTION_SYSTEM_TEXT,
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ],
                 messages=[{"role": "user", "content": reflection_content}],
             )
             raw = ""
@@ -1,16 +1,20 @@
 from __future__ import annotations
 
 import base64
+import functools
 import io
+import itertools
+import operator
 import sys
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Literal
 
 import Quartz  # type: ignore
-from AppKit import NSWorkspace  # type: ignore
+from AppKit import NSPasteboard, NSPasteboardItem, NSPasteboardTypeString, NSWorkspace  # type: ignore
 from ApplicationServices import AXIsProcessTrusted  # type: ignore
-from PIL import Image, ImageChops
+from PIL import Image, ImageChops, ImageStat
 
 
 ComputerAction = Literal[
@@ -70,6 +74,14 @@ _MODIFIER_FLAGS: dict[str, int] = {
     "cmd": Quartz.kCGEventFlagMaskCommand,
 }
 
+# Every modifier subset (by normalized name) -> OR-ed CGEvent flag mask.
+# 16 entries, built once, so combo parsing does a single lookup for flags.
+_COMBO_FLAGS: dict[frozenset[str], int] = {
+    frozenset(combo): functools.reduce(operator.or_, (_MODIFIER_FLAGS[m] for m in combo), 0)
+    for n in range(5)
+    for combo in itertools.combinations(("shift", "control", "option", "command"), n)
+}
+
 _FORBIDDEN_COMBOS = frozenset({
     "command+q", "command+tab", "command+option+esc",
     "command+w", "command+m",
@@ -93,21 +105,40 @@ class ToolResult:
 _FL_BUNDLE_ID = "com.image-line.flstudio"
 
 
-def _find_fl_pid() -> int | None:
+def _find_fl_app() -> Any | None:
+    """Return FL Studio's NSRunningApplication, or None if it is not running."""
     ws = NSWorkspace.sharedWorkspace()
     for app in ws.runningApplications():
         if (app.bundleIdentifier() or "") == _FL_BUNDLE_ID:
-            return app.processIdentifier()
+            return app
     return None
 
 
-def _activate_fl_studio() -> None:
+def _find_fl_pid() -> int | None:
+    app = _find_fl_app()
+    return app.processIdentifier() if app is not None else None
+
+
+def _is_fl_frontmost(ws: Any) -> bool:
+    front = ws.frontmostApplication()
+    return front is not None and (front.bundleIdentifier() or "") == _FL_BUNDLE_ID
+
+
+def _activate_fl_studio(timeout_s: float = 0.3) -> None:
     ws = NSWorkspace.sharedWorkspace()
+    # Common case: FL already has focus, so there is nothing to wait for.
+    if _is_fl_frontmost(ws):
+        return
     for app in ws.runningApplications():
         if (app.bundleIdentifier() or "") == _FL_BUNDLE_ID:
             # NSApplicationActivateAllWindows | NSApplicationActivateIgnoringOtherApps
             app.activateWithOptions_(3)
-            time.sleep(0.1)
+            # Poll for the switch instead of a fixed worst-case sleep.
+            deadline = time.time() + timeout_s
+            while time.time() < deadline:
+                if _is_fl_frontmost(ws):
+                    return
+                time.sleep(0.01)
             return
 
 
@@ -128,6 +159,14 @@ _INPUT_ACTIONS = frozenset({
 })
 
 
+# One private event source shared by every _cg_* poster. Passing None would make
+# Quartz synthesize a transient source per event. Suppression interval 0 means
+# macOS does not swallow back-to-back synthetic events.
+_EVENT_SRC = Quartz.CGEventSourceCreate(Quartz.kCGEventSourceStatePrivate)
+Quartz.CGEventSourceSetLocalEventsSuppressionInterval(_EVENT_SRC, 0.0)
+_TYPE_THROTTLE_EVERY = 16
+
+
 def _has_post_event_access() -> bool:
     try:
         return bool(Quartz.CGPreflightPostEventAccess())
@@ -153,15 +192,21 @@ def _build_input_access_error() -> str:
 
 
 def _cg_post_key_to_pid(pid: int, keycode: int, down: bool, flags: int = 0) -> None:
-    event = Quartz.CGEventCreateKeyboardEvent(None, keycode, down)
+    event = Quartz.CGEventCreateKeyboardEvent(_EVENT_SRC, keycode, down)
     if flags:
         Quartz.CGEventSetFlags(event, flags | Quartz.CGEventGetFlags(event))
     Quartz.CGEventPostToPid(pid, event)
 
 
-def _cg_press_key(pid: int, keycode: int, flags: int = 0) -> None:
+_KEY_HOLD_S = 0.05
+# Taps inside a sequence ("Escape Escape Escape") only need to register as
+# distinct presses, not as deliberate holds.
+_SEQUENCE_KEY_HOLD_S = 0.01
+
+
+def _cg_press_key(pid: int, keycode: int, flags: int = 0, hold_s: float = _KEY_HOLD_S) -> None:
     _cg_post_key_to_pid(pid, keycode, True, flags)
-    time.sleep(0.05)
+    time.sleep(hold_s)
     _cg_post_key_to_pid(pid, keycode, False, flags)
 
 
@@ -178,21 +223,26 @@ def _normalize_key_name(k: str) -> str:
     return k
 
 
-def _press_key_combo(combo: str, pid: int) -> None:
-    raw = combo.strip()
+@functools.lru_cache(maxsize=512)
+def _parse_combo(raw: str) -> tuple[tuple[int, int], ...]:
+    """
+    Resolve a key string to the (keycode, flags) presses it stands for.
 
+    Keycodes are static, so each distinct combo is parsed once per process.
+    Raises ValueError for forbidden combos and unknown keys (not cached).
+    """
     # Repeated keys: "Escape Escape Escape"
     if " " in raw and "+" not in raw:
+        presses: list[tuple[int, int]] = []
         for k in raw.split():
-            k = _normalize_key_name(k)
-            keycode = _KEYCODES.get(k)
+            keycode = _KEYCODES.get(_normalize_key_name(k))
             if keycode is not None:
-                _cg_press_key(pid, keycode)
-        return
+                presses.append((keycode, 0))
+        return tuple(presses)
 
     parts = [_normalize_key_name(p) for p in raw.split("+") if p.strip()]
     if not parts:
-        return
+        return ()
 
     normalized = "+".join(parts)
     if normalized in _FORBIDDEN_COMBOS:
@@ -216,29 +266,35 @@ def _press_key_combo(combo: str, pid: int) -> None:
     if keycode is None:
         raise ValueError(f"Unknown key: {main_key!r}")
 
-    flags = 0
-    for m in modifiers:
-        flags |= _MODIFIER_FLAGS.get(m, 0)
+    return ((keycode, _COMBO_FLAGS[frozenset(modifiers)]),)
 
-    _cg_press_key(pid, keycode, flags)
+
+def _press_key_combo(combo: str, pid: int) -> None:
+    presses = _parse_combo(combo.strip())
+    hold_s = _SEQUENCE_KEY_HOLD_S if len(presses) > 1 else _KEY_HOLD_S
+    for keycode, flags in presses:
+        _cg_press_key(pid, keycode, flags, hold_s)
 
 
 def _cg_move(x: int, y: int) -> None:
     Quartz.CGWarpMouseCursorPosition(Quartz.CGPointMake(x, y))
 
 
+_BTN_MAP: dict[str, tuple[int, int, int]] = {
+    "left": (Quartz.kCGEventLeftMouseDown, Quartz.kCGEventLeftMouseUp, Quartz.kCGMouseButtonLeft),
+    "right": (Quartz.kCGEventRightMouseDown, Quartz.kCGEventRightMouseUp, Quartz.kCGMouseButtonRight),
+    "middle": (Quartz.kCGEventOtherMouseDown, Quartz.kCGEventOtherMouseUp, Quartz.kCGMouseButtonCenter),
+}
+
+
 def _cg_click(x: int, y: int, button: str = "left", clicks: int = 1) -> None:
     pt = Quartz.CGPointMake(x, y)
-    btn_map = {
-        "left": (Quartz.kCGEventLeftMouseDown, Quartz.kCGEventLeftMouseUp, Quartz.kCGMouseButtonLeft),
-        "right": (Quartz.kCGEventRightMouseDown, Quartz.kCGEventRightMouseUp, Quartz.kCGMouseButtonRight),
-        "middle": (Quartz.kCGEventOtherMouseDown, Quartz.kCGEventOtherMouseUp, Quartz.kCGMouseButtonCenter),
-    }
-    down_type, up_type, btn = btn_map.get(button, btn_map["left"])
+    down_type, up_type, btn = _BTN_MAP.get(button, _BTN_MAP["left"])
 
+    # One down/up pair for the whole burst; only the click-state counter changes.
+    down = Quartz.CGEventCreateMouseEvent(_EVENT_SRC, down_type, pt, btn)
+    up = Quartz.CGEventCreateMouseEvent(_EVENT_SRC, up_type, pt, btn)
     for i in range(clicks):
-        down = Quartz.CGEventCreateMouseEvent(None, down_type, pt, btn)
-        up = Quartz.CGEventCreateMouseEvent(None, up_type, pt, btn)
         if clicks > 1:
             Quartz.CGEventSetIntegerValueField(down, Quartz.kCGMouseEventClickState, i + 1)
             Quartz.CGEventSetIntegerValueField(up, Quartz.kCGMouseEventClickState, i + 1)
@@ -249,6 +305,9 @@ def _cg_click(x: int, y: int, button: str = "left", clicks: int = 1) -> None:
             time.sleep(0.05)
 
 
+_DRAG_STEPS = 20
+
+
 def _cg_drag(x0: int, y0: int, x1: int, y1: int, duration: float = 0.2) -> None:
     pt0 = Quartz.CGPointMake(x0, y0)
     pt1 = Quartz.CGPointMake(x1, y1)
@@ -256,43 +315,107 @@ def _cg_drag(x0: int, y0: int, x1: int, y1: int, duration: float = 0.2) -> None:
     Quartz.CGWarpMouseCursorPosition(pt0)
     time.sleep(0.05)
 
-    down = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseDown, pt0, Quartz.kCGMouseButtonLeft)
+    down = Quartz.CGEventCreateMouseEvent(_EVENT_SRC, Quartz.kCGEventLeftMouseDown, pt0, Quartz.kCGMouseButtonLeft)
     Quartz.CGEventPost(Quartz.kCGHIDEventTap, down)
-    time.sleep(duration)
 
-    drag = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseDragged, pt1, Quartz.kCGMouseButtonLeft)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, drag)
+    # Walk the path in small steps: apps (FL included) often ignore a single
+    # jump-to-endpoint drag event. One event is moved along instead of reallocated.
+    drag = Quartz.CGEventCreateMouseEvent(_EVENT_SRC, Quartz.kCGEventLeftMouseDragged, pt0, Quartz.kCGMouseButtonLeft)
+    step_sleep = duration / _DRAG_STEPS
+    for i in range(1, _DRAG_STEPS + 1):
+        t = i / _DRAG_STEPS
+        Quartz.CGEventSetLocation(drag, Quartz.CGPointMake(x0 + (x1 - x0) * t, y0 + (y1 - y0) * t))
+        Quartz.CGEventPost(Quartz.kCGHIDEventTap, drag)
+        time.sleep(step_sleep)
     time.sleep(0.05)
 
-    up = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseUp, pt1, Quartz.kCGMouseButtonLeft)
+    up = Quartz.CGEventCreateMouseEvent(_EVENT_SRC, Quartz.kCGEventLeftMouseUp, pt1, Quartz.kCGMouseButtonLeft)
     Quartz.CGEventPost(Quartz.kCGHIDEventTap, up)
 
 
 def _cg_scroll(dx: int = 0, dy: int = 0) -> None:
     event = Quartz.CGEventCreateScrollWheelEvent(
-        None, Quartz.kCGScrollEventUnitLine, 2, int(dy), int(dx)
+        _EVENT_SRC, Quartz.kCGScrollEventUnitLine, 2, int(dy), int(dx)
     )
     Quartz.CGEventPost(Quartz.kCGHIDEventTap, event)
 
 
-def _cg_type_text(pid: int, text: str, interval: float = 0.012) -> None:
-    for char in text:
-        down = Quartz.CGEventCreateKeyboardEvent(None, 0, True)
-        up = Quartz.CGEventCreateKeyboardEvent(None, 0, False)
+# Above this length, one cmd+v beats posting a keyboard event pair per character.
+_PASTE_MIN_CHARS = 20
+
+
+def _snapshot_pasteboard(pb: Any) -> list[dict[str, Any]]:
+    """Copy every item on `pb` with the data for each of its types."""
+    snapshot: list[dict[str, Any]] = []
+    for item in pb.pasteboardItems() or []:
+        datas = {}
+        for ptype in item.types() or []:
+            data = item.dataForType_(ptype)
+            if data is not None:
+                datas[ptype] = data
+        snapshot.append(datas)
+    return snapshot
+
+
+def _restore_pasteboard(pb: Any, snapshot: list[dict[str, Any]]) -> None:
+    pb.clearContents()
+    items = []
+    for datas in snapshot:
+        item = NSPasteboardItem.alloc().init()
+        for ptype, data in datas.items():
+            item.setData_forType_(data, ptype)
+        items.append(item)
+    if items:
+        pb.writeObjects_(items)
+
+
+def _paste_text(pid: int, text: str) -> None:
+    pb = NSPasteboard.generalPasteboard()
+    # Keep all items and types (images, files, rich text), not just the string.
+    previous = _snapshot_pasteboard(pb)
+    pb.clearContents()
+    pb.setString_forType_(text, NSPasteboardTypeString)
+    ours = pb.changeCount()
+    _cg_press_key(pid, _KEYCODES["v"], _COMBO_FLAGS[frozenset({"command"})])
+    # The target reads the pasteboard asynchronously; give it time before restoring.
+    time.sleep(0.15)
+    # Leave the pasteboard alone if something else was copied in the meantime.
+    if pb.changeCount() == ours:
+        _restore_pasteboard(pb, previous)
+
+
+def _cg_type_text(pid: int, text: str) -> None:
+    if len(text) > _PASTE_MIN_CHARS:
+        _paste_text(pid, text)
+        return
+    # One down/up pair is retargeted per character instead of allocating two events each.
+    down = Quartz.CGEventCreateKeyboardEvent(_EVENT_SRC, 0, True)
+    up = Quartz.CGEventCreateKeyboardEvent(_EVENT_SRC, 0, False)
+    for i, char in enumerate(text, 1):
         Quartz.CGEventKeyboardSetUnicodeString(down, len(char), char)
         Quartz.CGEventKeyboardSetUnicodeString(up, len(char), char)
         Quartz.CGEventPostToPid(pid, down)
-        time.sleep(interval)
         Quartz.CGEventPostToPid(pid, up)
-        time.sleep(interval)
+        if i % _TYPE_THROTTLE_EVERY == 0:
+            # Brief yield so the target's event queue can drain on long strings.
+            time.sleep(0.001)
 
 
 # ── Image helpers ─────────────────────────────────────────────────────────────
 
-def _image_to_base64_png(img: Image.Image) -> str:
+# Screenshots are sent once and discarded, so favor encode speed over size.
+_PNG_COMPRESS_LEVEL = 1
+
+
+def _encode_png(img: Image.Image, compress_level: int = _PNG_COMPRESS_LEVEL) -> memoryview:
     buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return base64.b64encode(buf.getvalue()).decode("ascii")
+    img.save(buf, format="PNG", optimize=False, compress_level=compress_level)
+    # Zero-copy view of the BytesIO contents (the view keeps the buffer alive).
+    return buf.getbuffer()
+
+
+def _image_to_base64_png(img: Image.Image, compress_level: int = _PNG_COMPRESS_LEVEL) -> str:
+    return base64.b64encode(_encode_png(img, compress_level)).decode("ascii")
 
 
 def _cgimage_to_pil(cgimg: Any) -> Image.Image:
@@ -301,9 +424,41 @@ def _cgimage_to_pil(cgimg: Any) -> Image.Image:
     bpr = Quartz.CGImageGetBytesPerRow(cgimg)
     provider = Quartz.CGImageGetDataProvider(cgimg)
     data = Quartz.CGDataProviderCopyData(provider)
-    buf = bytes(data)
-    img = Image.frombuffer("RGBA", (width, height), buf, "raw", "BGRA", bpr, 1)
-    return img.copy()
+    # CFData exposes the buffer protocol, so PIL reads the CG backing store directly.
+    # BGRA->RGBA unpacking already lands in PIL-owned memory: no bytes() or .copy() pass.
+    return Image.frombuffer("RGBA", (width, height), memoryview(data), "raw", "BGRA", bpr, 1)
+
+
+def _fit_to_api_space(img: Image.Image, width: int, height: int) -> Image.Image:
+    """
+    Scale a capture to the API display size.
+
+    Exact integer ratios (retina 2x -> 1x) use a box reduce; anything else uses
+    bilinear with a reducing gap. LANCZOS buys nothing visible at these ratios.
+    """
+    src_w, src_h = img.size
+    if (src_w, src_h) == (width, height):
+        return img
+    if src_w % width == 0 and src_h % height == 0 and src_w >= width and src_h >= height:
+        return img.reduce((src_w // width, src_h // height))
+    return img.resize((width, height), Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+
+# "Did the UI change" survives a 4x box downsample; comparing 1/16 of the pixels is enough.
+_SETTLE_REDUCE_FACTOR = 4
+
+
+def _settle_probe(img: Image.Image) -> Image.Image:
+    return img.reduce(_SETTLE_REDUCE_FACTOR).convert("L")
+
+
+def _mean_abs_delta(a: Image.Image, b: Image.Image) -> float:
+    """Mean absolute difference of two grayscale frames, normalized to 0..1."""
+    diff = ImageChops.difference(a, b)
+    if diff.getbbox() is None:
+        # Identical frames (the usual case once the UI is steady): skip the stat pass.
+        return 0.0
+    return ImageStat.Stat(diff).mean[0] / 255.0
 
 
 # ── ComputerTool ──────────────────────────────────────────────────────────────
@@ -315,7 +470,7 @@ class ComputerTool:
     Backed by macOS Quartz CGEvent APIs:
     - Keys via CGEventPostToPid (bypasses focus requirements)
     - Mouse via CGWarpMouseCursorPosition + CGEventPost
-    - Screenshots via CGWindowListCreateImage
+    - Screenshots via CGDisplayCreateImageForRect (CGWindowListCreateImage fallback)
 
     Coordinates are in API display space (display_width_px x display_height_px)
     and mapped to FL Studio's window bounds.
@@ -331,15 +486,28 @@ class ComputerTool:
         display_width_px: int,
         display_height_px: int,
         enable_zoom: bool = True,
+        png_compress_level: int = _PNG_COMPRESS_LEVEL,
     ):
         self.api_type = str(api_type)
         self.display_width_px = int(display_width_px)
         self.display_height_px = int(display_height_px)
         self.enable_zoom = bool(enable_zoom)
+        self.png_compress_level = int(png_compress_level)
 
-        self._fl_pid: int | None = None
+        self._fl_app: Any | None = None  # NSRunningApplication
         self._fl_window_id: int | None = None
         self._fl_window_bounds: tuple[int, int, int, int] | None = None  # x, y, w, h
+        self._encode_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cortex-png")
+
+    def close(self) -> None:
+        """Stop the PNG encode workers; queued encodes are dropped."""
+        self._encode_pool.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self) -> ComputerTool:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
 
     def to_tool_param(self) -> dict[str, Any]:
         tool: dict[str, Any] = {
@@ -352,20 +520,21 @@ class ComputerTool:
             tool["enable_zoom"] = True
         return tool
 
+    def _to_png_b64(self, img: Image.Image) -> str:
+        return _image_to_base64_png(img, self.png_compress_level)
+
     # ── FL Studio state ───────────────────────────────────────────────────
 
     def _get_fl_pid(self) -> int | None:
-        if self._fl_pid is not None:
-            ws = NSWorkspace.sharedWorkspace()
-            for app in ws.runningApplications():
-                if app.processIdentifier() == self._fl_pid:
-                    return self._fl_pid
-            # Cached PID went stale after app restart.
-            self._fl_pid = None
-
-        if self._fl_pid is None:
-            self._fl_pid = _find_fl_pid()
-        return self._fl_pid
+        # Holding the NSRunningApplication makes the staleness check O(1):
+        # no walk over every running app on each action.
+        if self._fl_app is not None and not self._fl_app.isTerminated():
+            return self._fl_app.processIdentifier()
+        # Not found yet, or the cached app quit/restarted.
+        self._fl_app = _find_fl_app()
+        if self._fl_app is None:
+            return None
+        return self._fl_app.processIdentifier()
 
     def _require_fl_pid(self) -> int:
         pid = self._get_fl_pid()
@@ -411,7 +580,36 @@ class ComputerTool:
             self._fl_window_id, self._fl_window_bounds = found
         return self._fl_window_bounds
 
+    def _describe_known_window(self, wid: int) -> tuple[int, int, int, int] | None:
+        """Re-read bounds for a known window id without enumerating every onscreen window."""
+        try:
+            infos = Quartz.CGWindowListCreateDescriptionFromArray([wid]) or []
+        except Exception:
+            return None
+        for w in infos:
+            try:
+                if w.get("kCGWindowOwnerName") not in ("FL Studio", "OsxFL"):
+                    continue
+                if int(w.get("kCGWindowLayer", 0)) != 0 or not w.get("kCGWindowIsOnscreen", False):
+                    continue
+                bounds = w.get("kCGWindowBounds") or {}
+                x = int(bounds.get("X", 0))
+                y = int(bounds.get("Y", 0))
+                ww = int(bounds.get("Width", 0))
+                wh = int(bounds.get("Height", 0))
+            except Exception:
+                continue
+            if ww > 0 and wh > 0:
+                return x, y, ww, wh
+        return None
+
     def _refresh_fl_window(self) -> tuple[int, int, int, int] | None:
+        if self._fl_window_id is not None:
+            bounds = self._describe_known_window(self._fl_window_id)
+            if bounds is not None:
+                self._fl_window_bounds = bounds
+                return bounds
+        # Window closed/hidden (or never found): fall back to a full scan.
         self._fl_window_id = None
         self._fl_window_bounds = None
         return self._get_fl_bounds()
@@ -526,6 +724,31 @@ class ComputerTool:
             return None
         return _cgimage_to_pil(cgimg), bounds
 
+    def _capture_window_rect(
+        self, display_id: int, bounds: tuple[int, int, int, int]
+    ) -> Image.Image | None:
+        """
+        Capture only the window rect from its display.
+
+        Avoids compositing every onscreen window just to crop one back out.
+        Returns None when the rect is not fully on the display or capture fails,
+        so callers fall back to the composited path.
+        """
+        db = self._display_bounds(display_id)
+        if db is None:
+            return None
+        x, y, ww, wh = bounds
+        dx, dy, dw, dh = db
+        if x < dx or y < dy or x + ww > dx + dw or y + wh > dy + dh:
+            return None
+        try:
+            cgimg = Quartz.CGDisplayCreateImageForRect(display_id, Quartz.CGRectMake(x - dx, y - dy, ww, wh))
+        except Exception:
+            return None
+        if cgimg is None:
+            return None
+        return _cgimage_to_pil(cgimg)
+
     def _capture_fl_window(self) -> Image.Image | None:
         found = self._find_fl_window()
         if found is None:
@@ -535,6 +758,10 @@ class ComputerTool:
         self._fl_window_bounds = (x, y, ww, wh)
 
         display_id = self._display_for_window((x, y, ww, wh))
+        direct = self._capture_window_rect(display_id, (x, y, ww, wh))
+        if direct is not None:
+            return direct
+
         captured = self._capture_display(display_id)
         if captured is None:
             raise RuntimeError(
@@ -567,16 +794,7 @@ class ComputerTool:
         )
         if cgimg is None:
             return None
-
-        width = Quartz.CGImageGetWidth(cgimg)
-        height = Quartz.CGImageGetHeight(cgimg)
-        bpr = Quartz.CGImageGetBytesPerRow(cgimg)
-        provider = Quartz.CGImageGetDataProvider(cgimg)
-        data = Quartz.CGDataProviderCopyData(provider)
-        buf = bytes(data)
-
-        img = Image.frombuffer("RGBA", (width, height), buf, "raw", "BGRA", bpr, 1)
-        return img.copy()
+        return _cgimage_to_pil(cgimg)
 
     def _screenshot_api_space(self) -> Image.Image:
         window_img = self._capture_fl_window()
@@ -584,27 +802,37 @@ class ComputerTool:
             raise RuntimeError(
                 "FL Studio window not found. Make sure FL Studio is visible (not minimized)."
             )
-        if window_img.size != (self.display_width_px, self.display_height_px):
-            window_img = window_img.resize(
-                (self.display_width_px, self.display_height_px), Image.Resampling.LANCZOS
-            )
-        return window_img
+        return _fit_to_api_space(window_img, self.display_width_px, self.display_height_px)
 
     def _wait_for_ui_settle(
         self, timeout_s: float = 5.0, interval_s: float = 0.4, threshold: float = 0.985
-    ) -> Image.Image:
+    ) -> tuple[Image.Image, Future[str]]:
+        """
+        Poll until consecutive frames match, returning the frame and its PNG encode.
+
+        The newest frame is encoded on the worker pool while the settle sleep
+        runs; once a newer frame is captured the older one can never be
+        returned, so its encode is cancelled if it hasn't started.
+        """
         prev = self._screenshot_api_space()
+        prev_probe = _settle_probe(prev)
+        prev_encoded = self._encode_pool.submit(self._to_png_b64, prev)
         deadline = time.time() + timeout_s
         while time.time() < deadline:
             time.sleep(interval_s)
             curr = self._screenshot_api_space()
-            diff = ImageChops.difference(prev, curr)
-            mean_delta = sum(diff.convert("L").getdata()) / (255.0 * diff.size[0] * diff.size[1])
-            similarity = 1.0 - mean_delta
+            prev_encoded.cancel()
+            curr_encoded = self._encode_pool.submit(self._to_png_b64, curr)
+            curr_probe = _settle_probe(curr)
+            similarity = 1.0 - _mean_abs_delta(prev_probe, curr_probe)
             if similarity >= threshold:
-                return curr
-            prev = curr
-        return prev
+                return curr, curr_encoded
+            prev, prev_probe, prev_encoded = curr, curr_probe, curr_encoded
+        return prev, prev_encoded
+
+    def _settled_png_b64(self, **kwargs: Any) -> str:
+        _, encoded = self._wait_for_ui_settle(**kwargs)
+        return encoded.result()
 
     # ── Coordinate mapping ────────────────────────────────────────────────
 
@@ -647,7 +875,7 @@ class ComputerTool:
 
             if action == "screenshot":
                 img = self._screenshot_api_space()
-                return ToolResult(base64_image_png=_image_to_base64_png(img))
+                return ToolResult(base64_image_png=self._to_png_b64(img))
 
             if self._refresh_fl_window() is None:
                 return ToolResult(error="FL Studio window not found; refusing to execute action.")
@@ -659,7 +887,7 @@ class ComputerTool:
                 point = Quartz.CGEventGetLocation(event)
                 return ToolResult(
                     output=f"X={int(point.x)},Y={int(point.y)}",
-                    base64_image_png=_image_to_base64_png(self._screenshot_api_space()),
+                    base64_image_png=self._to_png_b64(self._screenshot_api_space()),
                 )
 
             if action == "wait":
@@ -667,7 +895,7 @@ class ComputerTool:
                 if not isinstance(duration, (int, float)) or duration < 0 or duration > 60:
                     return ToolResult(error=f"Invalid duration: {duration!r}")
                 time.sleep(float(duration))
-                return ToolResult(base64_image_png=_image_to_base64_png(self._screenshot_api_space()))
+                return ToolResult(base64_image_png=self._to_png_b64(self._screenshot_api_space()))
 
             if action == "mouse_move":
                 coord = tool_input.get("coordinate")
@@ -675,8 +903,7 @@ class ComputerTool:
                     return ToolResult(error=f"mouse_move requires [x,y], got: {coord!r}")
                 ax, ay = self._api_to_screen(int(coord[0]), int(coord[1]))
                 _cg_move(ax, ay)
-                img = self._wait_for_ui_settle(timeout_s=2.0)
-                return ToolResult(base64_image_png=_image_to_base64_png(img))
+                return ToolResult(base64_image_png=self._settled_png_b64(timeout_s=2.0))
 
             if action in ("left_click", "right_click", "middle_click", "double_click", "triple_click"):
                 coord = tool_input.get("coordinate")
@@ -694,8 +921,7 @@ class ComputerTool:
                 button = {"left_click": "left", "right_click": "right", "middle_click": "middle"}.get(action, "left")
                 clicks = {"double_click": 2, "triple_click": 3}.get(action, 1)
                 _cg_click(ax, ay, button=button, clicks=clicks)
-                img = self._wait_for_ui_settle()
-                return ToolResult(base64_image_png=_image_to_base64_png(img))
+                return ToolResult(base64_image_png=self._settled_png_b64())
 
             if action == "left_click_drag":
                 start = tool_input.get("start_coordinate")
@@ -705,8 +931,7 @@ class ComputerTool:
                 ax0, ay0 = self._api_to_screen(int(start[0]), int(start[1]))
                 ax1, ay1 = self._api_to_screen(int(end[0]), int(end[1]))
                 _cg_drag(ax0, ay0, ax1, ay1)
-                img = self._wait_for_ui_settle()
-                return ToolResult(base64_image_png=_image_to_base64_png(img))
+                return ToolResult(base64_image_png=self._settled_png_b64())
 
             if action == "scroll":
                 direction = tool_input.get("scroll_direction")
@@ -733,16 +958,14 @@ class ComputerTool:
                 elif direction == "right":
                     dx = amount
                 _cg_scroll(dx=dx, dy=dy)
-                img = self._wait_for_ui_settle()
-                return ToolResult(base64_image_png=_image_to_base64_png(img))
+                return ToolResult(base64_image_png=self._settled_png_b64())
 
             if action == "key":
                 text = tool_input.get("text")
                 if not isinstance(text, str) or not text.strip():
                     return ToolResult(error=f"key requires non-empty text, got: {text!r}")
                 _press_key_combo(text, pid)
-                img = self._wait_for_ui_settle()
-                return ToolResult(base64_image_png=_image_to_base64_png(img))
+                return ToolResult(base64_image_png=self._settled_png_b64())
 
             if action == "hold_key":
                 text = tool_input.get("text")
@@ -758,22 +981,19 @@ class ComputerTool:
                 _cg_post_key_to_pid(pid, keycode, True)
                 time.sleep(float(duration))
                 _cg_post_key_to_pid(pid, keycode, False)
-                img = self._wait_for_ui_settle()
-                return ToolResult(base64_image_png=_image_to_base64_png(img))
+                return ToolResult(base64_image_png=self._settled_png_b64())
 
             if action == "type":
                 text = tool_input.get("text")
                 if not isinstance(text, str):
                     return ToolResult(error=f"type requires text string, got: {text!r}")
                 _cg_type_text(pid, text)
-                img = self._wait_for_ui_settle()
-                return ToolResult(base64_image_png=_image_to_base64_png(img))
+                return ToolResult(base64_image_png=self._settled_png_b64())
 
             if action == "zoom":
                 region = tool_input.get("region")
                 if not (isinstance(region, (list, tuple)) and len(region) == 4 and all(isinstance(c, int) and c >= 0 for c in region)):
                     return ToolResult(error=f"zoom requires region [x0,y0,x1,y1], got: {region!r}")
-                img = self._screenshot_api_space()
                 x0, y0, x1, y1 = int(region[0]), int(region[1]), int(region[2]), int(region[3])
                 x0 = max(0, min(self.display_width_px - 1, x0))
                 y0 = max(0, min(self.display_height_px - 1, y0))
@@ -781,8 +1001,23 @@ class ComputerTool:
                 y1 = max(0, min(self.display_height_px, y1))
                 if x1 <= x0 or y1 <= y0:
                     return ToolResult(error=f"Invalid zoom region: {(x0, y0, x1, y1)}")
-                cropped = img.crop((x0, y0, x1, y1))
-                return ToolResult(base64_image_png=_image_to_base64_png(cropped))
+                window_img = self._capture_fl_window()
+                if window_img is None:
+                    raise RuntimeError(
+                        "FL Studio window not found. Make sure FL Studio is visible (not minimized)."
+                    )
+                # Crop the native capture first and scale only the region, rather than
+                # scaling the whole frame to API space just to cut a small piece out.
+                sx = window_img.width / float(self.display_width_px)
+                sy = window_img.height / float(self.display_height_px)
+                native_box = (
+                    int(round(x0 * sx)),
+                    int(round(y0 * sy)),
+                    max(int(round(x0 * sx)) + 1, int(round(x1 * sx))),
+                    max(int(round(y0 * sy)) + 1, int(round(y1 * sy))),
+                )
+                cropped = _fit_to_api_space(window_img.crop(native_box), x1 - x0, y1 - y0)
+                return ToolResult(base64_image_png=self._to_png_b64(cropped))
 
             return ToolResult(error=f"Unsupported action: {action!r}")
 
@@ -21,6 +21,10 @@ class CortexConfig:
     display_width_px: int
     display_height_px: int
 
+    # zlib level (0-9) for tool screenshots. They are sent once and discarded,
+    # so the default favors encode speed over size.
+    png_compress_level: int
+
     # Prompt caching beta.
     enable_prompt_caching: bool
 
@@ -52,6 +56,7 @@ def load_config(*, require_api_key: bool = True) -> CortexConfig:
 
     display_width_px = _getenv_int("CORTEX_DISPLAY_WIDTH_PX", 1024)
     display_height_px = _getenv_int("CORTEX_DISPLAY_HEIGHT_PX", 768)
+    png_compress_level = max(0, min(9, _getenv_int("CORTEX_PNG_COMPRESS_LEVEL", 1)))
 
     model_decider = os.getenv("CORTEX_MODEL_DECIDER", "claude-haiku-4-5").strip()
     model_heavy = os.getenv("CORTEX_MODEL_HEAVY", "claude-opus-4-6").strip()
@@ -73,6 +78,7 @@ def load_config(*, require_api_key: bool = True) -> CortexConfig:
         model_visual_judge=model_visual_judge,
         display_width_px=display_width_px,
         display_height_px=display_height_px,
+        png_compress_level=png_compress_level,
         enable_prompt_caching=enable_prompt_caching,
         computer_tool_type_decider=os.getenv("CORTEX_COMPUTER_TOOL_DECIDER", "computer_20250124").strip(),
         computer_tool_type_heavy=os.getenv("CORTEX_COMPUTER_TOOL_HEAVY", "computer_20251124").strip(),
@@ -1,15 +1,32 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import functools
+import io
+import itertools
 import json
+import mmap
 import os
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Awaitable, Iterable, Sequence, TypeVar
+
+from PIL import Image
+
+import json_compat
 
 
 EXTRACT_FL_STATE_TOOL_NAME = "extract_fl_state"
 DEFAULT_CONTRACT_PATH = Path("skills/fl-studio/drum-pattern/CONTRACT.json")
-
+# Reference screenshots are often full Retina captures; they only ground the
+# model visually, so a bounded size keeps the payload (and tokens) small.
+REFERENCE_IMAGE_MAX_SIDE = 1024
+# Multiple references are sent as one side-by-side strip; the API downsamples
+# anything past ~1568px on the long edge, so the strip is sized to fit.
+REFERENCE_STRIP_HEIGHT = 512
+REFERENCE_STRIP_MAX_WIDTH = 1568
+_REFERENCE_STRIP_GAP = 8
 
 def fl_state_tool_param() -> dict[str, Any]:
     return {
@@ -41,41 +58,142 @@ def _extract_json_object(raw: str) -> dict[str, Any]:
         return {}
     if text.startswith("{") and text.endswith("}"):
         try:
-            parsed = json.loads(text)
+            parsed = json_compat.loads(text)
             return parsed if isinstance(parsed, dict) else {}
         except json.JSONDecodeError:
-            return {}
+            pass
+    # raw_decode stops at the end of the first complete object, so trailing
+    # prose needs no rfind; later "{" are only tried if an earlier one fails.
     start = text.find("{")
-    end = text.rfind("}")
-    if start == -1 or end == -1 or end <= start:
-        return {}
-    try:
-        parsed = json.loads(text[start : end + 1])
+    while start != -1:
+        try:
+            parsed, _ = json_compat.raw_decode(text, start)
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+            continue
         return parsed if isinstance(parsed, dict) else {}
-    except json.JSONDecodeError:
-        return {}
+    return {}
 
 
-def _image_block_from_path(path: Path) -> dict[str, Any] | None:
-    try:
-        encoded = base64.b64encode(path.read_bytes()).decode("ascii")
-    except Exception:
-        return None
+def _prepare_image_bytes(
+    source: Path | bytes,
+    *,
+    max_side: int = REFERENCE_IMAGE_MAX_SIDE,
+) -> bytes:
+    """
+    Shrink to fit `max_side`, returning PNG bytes.
+    """
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as img:
+        img.load()
+        if max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.BILINEAR)
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+@functools.lru_cache(maxsize=64)
+def _encoded_reference_block(path_str: str, mtime_ns: int, size: int) -> dict[str, Any]:
+    # mtime_ns/size are only part of the cache key so an edited file is re-read.
+    with open(path_str, "rb") as f:
+        with Image.open(f) as img:  # header only; pixels are not decoded here
+            as_is = img.format == "PNG" and max(img.size) <= REFERENCE_IMAGE_MAX_SIDE
+        if as_is:
+            # Already small enough: base64 straight from the mapped file, no
+            # decode/re-encode and no intermediate bytes copy.
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                encoded = base64.b64encode(mm)
+        else:
+            encoded = base64.b64encode(_prepare_image_bytes(Path(path_str)))
     return {
         "type": "image",
         "source": {
             "type": "base64",
             "media_type": "image/png",
-            "data": encoded,
+            "data": encoded.decode("ascii"),
         },
     }
 
 
+def _image_block_from_path(path: Path) -> dict[str, Any] | None:
+    try:
+        block = _encoded_reference_block(*_file_key(path))
+    except Exception:
+        return None
+    # Copy so callers can't mutate the cached entry.
+    return {**block, "source": dict(block["source"])}
+
+
+def _file_key(path: Path) -> tuple[str, int, int]:
+    st = path.stat()
+    return str(path), st.st_mtime_ns, st.st_size
+
+
+@functools.lru_cache(maxsize=16)
+def _encoded_reference_strip(keys: tuple[tuple[str, int, int], ...]) -> tuple[str, tuple[str, ...]]:
+    frames: list[Image.Image] = []
+    used: list[str] = []
+    for path_str, _, _ in keys:
+        try:
+            with Image.open(path_str) as img:
+                frame = img.convert("RGB")
+        except Exception:
+            continue
+        frame.thumbnail((frame.width, REFERENCE_STRIP_HEIGHT), Image.BILINEAR)
+        frames.append(frame)
+        used.append(path_str)
+    if not frames:
+        return "", ()
+    height = max(f.height for f in frames)
+    width = sum(f.width for f in frames) + _REFERENCE_STRIP_GAP * (len(frames) - 1)
+    strip = Image.new("RGB", (width, height), (128, 128, 128))
+    x = 0
+    for frame in frames:
+        strip.paste(frame, (x, 0))
+        x += frame.width + _REFERENCE_STRIP_GAP
+    if width > REFERENCE_STRIP_MAX_WIDTH:
+        strip.thumbnail((REFERENCE_STRIP_MAX_WIDTH, height), Image.BILINEAR)
+    buf = io.BytesIO()
+    strip.save(buf, format="PNG", optimize=True)
+    return base64.b64encode(buf.getvalue()).decode("ascii"), tuple(used)
+
+
+def reference_content_blocks(paths: Sequence[Path]) -> tuple[list[dict[str, Any]], list[Path]]:
+    """
+    Content blocks for a set of reference images, plus the paths actually used.
+
+    Two or more references are composed into a single left-to-right strip so the
+    request carries one image block instead of several.
+    """
+    if len(paths) == 1:
+        block = _image_block_from_path(paths[0])
+        if block is None:
+            return [], []
+        return [{"type": "text", "text": f"reference_image={paths[0]}"}, block], [paths[0]]
+    keys: list[tuple[str, int, int]] = []
+    for p in paths:
+        try:
+            keys.append(_file_key(p))
+        except OSError:
+            continue
+    if not keys:
+        return [], []
+    data, used = _encoded_reference_strip(tuple(keys))
+    if not used:
+        return [], []
+    label = (
+        f"reference_strip: {len(used)} examples horizontally concatenated, left to right: "
+        + ", ".join(used)
+    )
+    block = {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": data}}
+    return [{"type": "text", "text": label}, block], [Path(u) for u in used]
+
+
 def _contract_reference_images(contract_path: Path = DEFAULT_CONTRACT_PATH) -> list[Path]:
     if not contract_path.exists():
         return []
     try:
-        raw = json.loads(contract_path.read_text(encoding="utf-8"))
+        raw = json_compat.loads(contract_path.read_bytes())
     except Exception:
         return []
     refs = raw.get("reference_images", [])
@@ -93,32 +211,54 @@ def _contract_reference_images(contract_path: Path = DEFAULT_CONTRACT_PATH) -> l
     return out[:3]
 
 
-def _resolve_reference_images() -> list[Path]:
+@functools.lru_cache(maxsize=1)
+def _resolve_reference_images_cached(env_path: str, cwd: str) -> tuple[Path, ...]:
+    # cwd is only part of the cache key: the contract path is relative to it.
     out: list[Path] = []
-    env_path = os.getenv("CORTEX_FL_REFERENCE_IMAGE", "").strip()
     if env_path:
         p = Path(env_path).expanduser()
         if p.exists():
             # Explicit user-provided reference is authoritative for demo runs.
             # Avoid mixing unrelated fallback screenshots when this is set.
-            return [p]
+            return (p,)
     for p in _contract_reference_images():
         if p not in out:
             out.append(p)
     if out:
         # Contract references are intentionally curated; prefer them over generic fallback.
-        return out[:3]
+        return tuple(out[:3])
     downloads_dir = Path.home() / "Downloads"
-    if downloads_dir.exists():
-        candidates = sorted(
-            downloads_dir.glob("Screenshot*.png"),
-            key=lambda p: p.stat().st_mtime if p.exists() else 0.0,
-            reverse=True,
-        )
-        for p in candidates[:2]:
-            if p.exists() and p not in out:
-                out.append(p)
-    return out[:3]
+    # One scandir pass and one stat per match; sorting then reads cached mtimes.
+    candidates: list[tuple[float, Path]] = []
+    try:
+        with os.scandir(downloads_dir) as it:
+            for entry in it:
+                if not (entry.name.startswith("Screenshot") and entry.name.endswith(".png")):
+                    continue
+                try:
+                    candidates.append((entry.stat().st_mtime, Path(entry.path)))
+                except OSError:
+                    continue
+    except OSError:
+        return tuple(out)
+    candidates.sort(key=lambda item: item[0], reverse=True)
+    for _, p in candidates[:2]:
+        if p not in out:
+            out.append(p)
+    return tuple(out[:3])
+
+
+def _resolve_reference_images() -> list[Path]:
+    # Env var, CONTRACT.json and Downloads probes are stable within a run.
+    env_path = os.getenv("CORTEX_FL_REFERENCE_IMAGE", "").strip()
+    return list(_resolve_reference_images_cached(env_path, os.getcwd()))
+
+
+def reset_reference_image_cache() -> None:
+    """
+    Drop the cached reference set (tests, or after adding reference files).
+    """
+    _resolve_reference_images_cached.cache_clear()
 
 
 def resolve_reference_images() -> list[Path]:
@@ -129,62 +269,103 @@ def resolve_reference_images() -> list[Path]:
 
 
 def _normalize_state(raw: dict[str, Any]) -> dict[str, Any]:
-    channel_rack_visible = bool(raw.get("channel_rack_visible", False))
-    grid = raw.get("grid")
-    rows = raw.get("rows")
-    kick = raw.get("kick_row_guess")
-    four = raw.get("four_on_floor")
-
-    if not isinstance(grid, dict):
-        grid = {}
-    if not isinstance(rows, list):
-        rows = []
-    if not isinstance(kick, dict):
-        kick = {}
-    if not isinstance(four, dict):
-        four = {}
-
+    # Fixed schema: one lookup per key, exact-type checks (json only ever yields
+    # plain dict/list), and the row filter stops after the 16 rows we keep.
+    get = raw.get
+    grid = get("grid")
+    rows = get("rows")
+    kick = get("kick_row_guess")
+    four = get("four_on_floor")
     return {
-        "channel_rack_visible": channel_rack_visible,
-        "grid": grid,
-        "rows": [r for r in rows if isinstance(r, dict)][:16],
-        "kick_row_guess": kick,
-        "four_on_floor": four,
+        "channel_rack_visible": bool(get("channel_rack_visible", False)),
+        "grid": grid if type(grid) is dict else {},
+        "rows": list(itertools.islice((r for r in rows if type(r) is dict), 16)) if type(rows) is list else [],
+        "kick_row_guess": kick if type(kick) is dict else {},
+        "four_on_floor": four if type(four) is dict else {},
     }
 
 
-def extract_fl_state_from_image(
-    *,
+EXTRACT_FL_STATE_SYSTEM = (
+    "You are a UI state extractor for FL Studio screenshots.\n"
+    "Return STRICT JSON object only.\n"
+    "Do not include markdown fences.\n"
+    "Schema:\n"
+    "{\n"
+    '  "channel_rack_visible": true|false,\n'
+    '  "grid": {"x_min": int|null, "x_max": int|null, "y_min": int|null, "y_max": int|null, "step_centers_x": [int], "confidence": 0.0},\n'
+    '  "rows": [{"index": int, "label": string, "y_center": int|null, "active_steps": [int], "confidence": 0.0}],\n'
+    '  "kick_row_guess": {"index": int|null, "label": string, "confidence": 0.0, "reason": string},\n'
+    '  "four_on_floor": {"target_steps":[1,5,9,13], "active_match": true|false, "missing_steps":[int], "extra_steps":[int], "confidence": 0.0}\n'
+    "}\n"
+    "Rules:\n"
+    "- Step numbering is 1..16 from left to right.\n"
+    "- Treat label variants as equivalent: Kick, 808 Kick, BD, Bass Drum.\n"
+    "- Confidence must be conservative if uncertain.\n"
+)
+BATCH_POLL_INTERVAL_S = 10.0
+DEFAULT_ASYNC_CONCURRENCY = 4
+
+T = TypeVar("T")
+
+
+def response_text(content: Any) -> str:
+    """
+    Concatenate the text blocks of a Messages API response.
+    """
+    raw = ""
+    for b in content:
+        bd = b.model_dump() if hasattr(b, "model_dump") else b  # type: ignore[attr-defined]
+        if isinstance(bd, dict) and bd.get("type") == "text":
+            raw += str(bd.get("text", ""))
+    return raw
+
+
+def run_message_batch(
     client: Any,
-    model: str,
-    screenshot_b64: str,
-    goal: str = "",
-    task_hint: str = "",
-) -> dict[str, Any]:
+    requests: list[dict[str, Any]],
+    *,
+    poll_interval_s: float = BATCH_POLL_INTERVAL_S,
+) -> dict[str, str | None]:
     """
-    Vision-first state extraction for FL Studio.
+    Submit `{"custom_id", "params"}` requests as one Message Batch and block until it ends.
 
-    We intentionally request structured state (rows/grid/active steps) instead of
-    free-form prose so the agent can plan from machine-readable UI facts.
+    Returns custom_id -> response text, or None when that request did not succeed
+    (errored, canceled, or expired). Batches trade latency for half-price,
+    high-throughput processing, so this is meant for offline eval sweeps rather
+    than the live agent loop.
     """
-    system = (
-        "You are a UI state extractor for FL Studio screenshots.\n"
-        "Return STRICT JSON object only.\n"
-        "Do not include markdown fences.\n"
-        "Schema:\n"
-        "{\n"
-        '  "channel_rack_visible": true|false,\n'
-        '  "grid": {"x_min": int|null, "x_max": int|null, "y_min": int|null, "y_max": int|null, "step_centers_x": [int], "confidence": 0.0},\n'
-        '  "rows": [{"index": int, "label": string, "y_center": int|null, "active_steps": [int], "confidence": 0.0}],\n'
-        '  "kick_row_guess": {"index": int|null, "label": string, "confidence": 0.0, "reason": string},\n'
-        '  "four_on_floor": {"target_steps":[1,5,9,13], "active_match": true|false, "missing_steps":[int], "extra_steps":[int], "confidence": 0.0}\n'
-        "}\n"
-        "Rules:\n"
-        "- Step numbering is 1..16 from left to right.\n"
-        "- Treat label variants as equivalent: Kick, 808 Kick, BD, Bass Drum.\n"
-        "- Confidence must be conservative if uncertain.\n"
-    )
+    batch = client.messages.batches.create(requests=requests)
+    while batch.processing_status != "ended":
+        time.sleep(poll_interval_s)
+        batch = client.messages.batches.retrieve(batch.id)
+    out: dict[str, str | None] = {str(r["custom_id"]): None for r in requests}
+    for entry in client.messages.batches.results(batch.id):
+        result = entry.result
+        out[entry.custom_id] = response_text(result.message.content) if result.type == "succeeded" else None
+    return out
+
+
+async def gather_bounded(
+    aws: Iterable[Awaitable[T]],
+    *,
+    concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+) -> list[T | BaseException]:
+    """
+    asyncio.gather with at most `concurrency` awaitables in flight.
 
+    Exceptions are returned in place (return_exceptions=True) so one failed
+    session does not cancel the rest of a sweep.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def _run(aw: Awaitable[T]) -> T:
+        async with sem:
+            return await aw
+
+    return await asyncio.gather(*(_run(aw) for aw in aws), return_exceptions=True)
+
+
+def _extract_fl_state_params(*, model: str, screenshot_b64: str, goal: str, task_hint: str) -> dict[str, Any]:
     content: list[dict[str, Any]] = [
         {
             "type": "text",
@@ -215,32 +396,102 @@ def extract_fl_state_from_image(
                 ),
             }
         )
-        for ref in ref_paths:
-            blk = _image_block_from_path(ref)
-            if blk is not None:
-                content.append({"type": "text", "text": f"reference_image={ref}"})
-                content.append(blk)
-
-    resp = client.messages.create(
-        model=model,
-        max_tokens=900,
-        system=system,
-        messages=[{"role": "user", "content": content}],
-    )
-    raw = ""
-    for b in resp.content:
-        bd = b.model_dump() if hasattr(b, "model_dump") else b  # type: ignore[attr-defined]
-        if isinstance(bd, dict) and bd.get("type") == "text":
-            raw += str(bd.get("text", ""))
+        ref_blocks, _ = reference_content_blocks(ref_paths)
+        content.extend(ref_blocks)
+
+    return {
+        "model": model,
+        "max_tokens": 900,
+        "system": EXTRACT_FL_STATE_SYSTEM,
+        "messages": [{"role": "user", "content": content}],
+    }
+
+
+def _failed_state(error: str, raw: str = "") -> dict[str, Any]:
+    return {
+        "channel_rack_visible": False,
+        "grid": {},
+        "rows": [],
+        "kick_row_guess": {},
+        "four_on_floor": {"target_steps": [1, 5, 9, 13], "active_match": False},
+        "error": error,
+        "raw": raw[:2000],
+    }
+
+
+def parse_fl_state(raw: str) -> dict[str, Any]:
+    """
+    Parse an extract_fl_state model reply into the normalized state shape.
+    """
     parsed = _extract_json_object(raw)
     if not parsed:
-        return {
-            "channel_rack_visible": False,
-            "grid": {},
-            "rows": [],
-            "kick_row_guess": {},
-            "four_on_floor": {"target_steps": [1, 5, 9, 13], "active_match": False},
-            "error": "state_extraction_parse_failed",
-            "raw": raw[:2000],
-        }
+        return _failed_state("state_extraction_parse_failed", raw)
     return _normalize_state(parsed)
+
+
+def extract_fl_state_from_image(
+    *,
+    client: Any,
+    model: str,
+    screenshot_b64: str,
+    goal: str = "",
+    task_hint: str = "",
+) -> dict[str, Any]:
+    """
+    Vision-first state extraction for FL Studio.
+
+    We intentionally request structured state (rows/grid/active steps) instead of
+    free-form prose so the agent can plan from machine-readable UI facts.
+    """
+    params = _extract_fl_state_params(model=model, screenshot_b64=screenshot_b64, goal=goal, task_hint=task_hint)
+    resp = client.messages.create(**params)
+    return parse_fl_state(response_text(resp.content))
+
+
+async def extract_fl_state_from_image_async(
+    *,
+    client: Any,
+    model: str,
+    screenshot_b64: str,
+    goal: str = "",
+    task_hint: str = "",
+) -> dict[str, Any]:
+    """
+    extract_fl_state_from_image for an AsyncAnthropic client, so several sessions
+    can overlap their network waits (see gather_bounded).
+    """
+    params = _extract_fl_state_params(model=model, screenshot_b64=screenshot_b64, goal=goal, task_hint=task_hint)
+    resp = await client.messages.create(**params)
+    return parse_fl_state(response_text(resp.content))
+
+
+def extract_fl_state_from_image_batch(
+    *,
+    client: Any,
+    model: str,
+    requests: Sequence[dict[str, str]],
+    poll_interval_s: float = BATCH_POLL_INTERVAL_S,
+) -> dict[str, dict[str, Any]]:
+    """
+    Batch variant of extract_fl_state_from_image for offline sweeps.
+
+    Each request needs `custom_id` (e.g. a session id; [A-Za-z0-9_-], max 64 chars)
+    and `screenshot_b64`, plus optional `goal` / `task_hint`. Returns custom_id -> state.
+    """
+    batch_requests = [
+        {
+            "custom_id": req["custom_id"],
+            "params": _extract_fl_state_params(
+                model=model,
+                screenshot_b64=req["screenshot_b64"],
+                goal=req.get("goal", ""),
+                task_hint=req.get("task_hint", ""),
+            ),
+        }
+        for req in requests
+    ]
+    raw_by_id = run_message_batch(client, batch_requests, poll_interval_s=poll_interval_s)
+    return {
+        custom_id: _failed_state("state_extraction_batch_failed") if raw is None else parse_fl_state(raw)
+        for custom_id, raw in raw_by_id.items()
+    }
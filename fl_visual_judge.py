@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-import base64
 import json
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Sequence
 
+import json_compat
+from fl_state import BATCH_POLL_INTERVAL_S, reference_content_blocks, response_text, run_message_batch
+
 
 @dataclass(frozen=True)
 class VisualJudgeResult:
@@ -37,19 +39,22 @@ def _extract_json_object(raw: str) -> dict[str, Any]:
         return {}
     if text.startswith("{") and text.endswith("}"):
         try:
-            parsed = json.loads(text)
+            parsed = json_compat.loads(text)
         except json.JSONDecodeError:
-            return {}
-        return parsed if isinstance(parsed, dict) else {}
+            parsed = None
+        if isinstance(parsed, dict):
+            return parsed
+    # raw_decode stops at the end of the first complete object, so trailing
+    # prose needs no rfind; later "{" are only tried if an earlier one fails.
     start = text.find("{")
-    end = text.rfind("}")
-    if start == -1 or end == -1 or end <= start:
-        return {}
-    try:
-        parsed = json.loads(text[start : end + 1])
-    except json.JSONDecodeError:
-        return {}
-    return parsed if isinstance(parsed, dict) else {}
+    while start != -1:
+        try:
+            parsed, _ = json_compat.raw_decode(text, start)
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+            continue
+        return parsed if isinstance(parsed, dict) else {}
+    return {}
 
 
 def _clamp01(value: Any, *, default: float = 0.0) -> float:
@@ -74,55 +79,34 @@ def _normalize_steps(raw_steps: Any) -> list[int]:
     return sorted(set(out))
 
 
-def _image_block_from_path(path: Path) -> dict[str, Any] | None:
-    try:
-        encoded = base64.b64encode(path.read_bytes()).decode("ascii")
-    except Exception:
-        return None
-    return {
-        "type": "image",
-        "source": {
-            "type": "base64",
-            "media_type": "image/png",
-            "data": encoded,
-        },
-    }
+JUDGE_SYSTEM = (
+    "You are a strict visual judge for FL Studio outcomes.\n"
+    "You receive one final run screenshot and zero or more reference screenshots.\n"
+    "Return STRICT JSON object only (no markdown):\n"
+    "{\n"
+    '  "passed": true|false,\n'
+    '  "score": 0.0,\n'
+    '  "confidence": 0.0,\n'
+    '  "reasons": ["..."],\n'
+    '  "observed_kick_label": "...",\n'
+    '  "observed_active_steps": [1,5,9,13]\n'
+    "}\n"
+    "Rules:\n"
+    "- Compare final screenshot against rubric and references.\n"
+    "- If uncertain, mark passed=false and lower confidence.\n"
+    "- Do not fabricate unseen details.\n"
+    "- Step numbering is 1..16 left-to-right.\n"
+)
 
 
-def judge_fl_visual(
+def _judge_params(
     *,
-    client: Any,
     model: str,
     final_screenshot_b64: str,
     task: str,
     rubric: str,
-    reference_images: Sequence[Path] = (),
-) -> VisualJudgeResult:
-    """
-    Visual judge for FL Studio UI outcomes.
-
-    This is intentionally separate from the executor and from extract_fl_state so
-    we can cross-check outcome quality with an independent authority.
-    """
-    system = (
-        "You are a strict visual judge for FL Studio outcomes.\n"
-        "You receive one final run screenshot and zero or more reference screenshots.\n"
-        "Return STRICT JSON object only (no markdown):\n"
-        "{\n"
-        '  "passed": true|false,\n'
-        '  "score": 0.0,\n'
-        '  "confidence": 0.0,\n'
-        '  "reasons": ["..."],\n'
-        '  "observed_kick_label": "...",\n'
-        '  "observed_active_steps": [1,5,9,13]\n'
-        "}\n"
-        "Rules:\n"
-        "- Compare final screenshot against rubric and references.\n"
-        "- If uncertain, mark passed=false and lower confidence.\n"
-        "- Do not fabricate unseen details.\n"
-        "- Step numbering is 1..16 left-to-right.\n"
-    )
-
+    reference_images: Sequence[Path],
+) -> tuple[dict[str, Any], list[str]]:
     content: list[dict[str, Any]] = [
         {
             "type": "text",
@@ -149,38 +133,36 @@ def judge_fl_visual(
                 "text": "REFERENCE_SCREENSHOTS follow. Treat these as success exemplars.",
             }
         )
-        for ref in reference_images:
-            block = _image_block_from_path(ref)
-            if block is None:
-                continue
-            refs_used.append(str(ref))
-            content.append({"type": "text", "text": f"reference_image={ref}"})
-            content.append(block)
-
-    resp = client.messages.create(
-        model=model,
-        max_tokens=500,
-        system=system,
-        messages=[{"role": "user", "content": content}],
+        ref_blocks, used = reference_content_blocks(list(reference_images))
+        refs_used = [str(p) for p in used]
+        content.extend(ref_blocks)
+
+    params = {
+        "model": model,
+        "max_tokens": 500,
+        "system": JUDGE_SYSTEM,
+        "messages": [{"role": "user", "content": content}],
+    }
+    return params, refs_used
+
+
+def _unparseable_result(reason: str, raw: str, refs_used: list[str]) -> VisualJudgeResult:
+    return VisualJudgeResult(
+        passed=False,
+        score=0.0,
+        confidence=0.0,
+        reasons=[reason],
+        observed_kick_label="",
+        observed_active_steps=[],
+        raw_response=raw[:2500],
+        reference_images_used=refs_used,
     )
-    raw = ""
-    for block in resp.content:
-        bd = block.model_dump() if hasattr(block, "model_dump") else block  # type: ignore[attr-defined]
-        if isinstance(bd, dict) and bd.get("type") == "text":
-            raw += str(bd.get("text", ""))
 
+
+def _result_from_raw(raw: str, refs_used: list[str]) -> VisualJudgeResult:
     parsed = _extract_json_object(raw)
     if not parsed:
-        return VisualJudgeResult(
-            passed=False,
-            score=0.0,
-            confidence=0.0,
-            reasons=["visual_judge_unparseable"],
-            observed_kick_label="",
-            observed_active_steps=[],
-            raw_response=raw[:2500],
-            reference_images_used=refs_used,
-        )
+        return _unparseable_result("visual_judge_unparseable", raw, refs_used)
 
     reasons = parsed.get("reasons")
     if not isinstance(reasons, list):
@@ -199,3 +181,88 @@ def judge_fl_visual(
         raw_response=raw[:2500],
         reference_images_used=refs_used,
     )
+
+
+def judge_fl_visual(
+    *,
+    client: Any,
+    model: str,
+    final_screenshot_b64: str,
+    task: str,
+    rubric: str,
+    reference_images: Sequence[Path] = (),
+) -> VisualJudgeResult:
+    """
+    Visual judge for FL Studio UI outcomes.
+
+    This is intentionally separate from the executor and from extract_fl_state so
+    we can cross-check outcome quality with an independent authority.
+    """
+    params, refs_used = _judge_params(
+        model=model,
+        final_screenshot_b64=final_screenshot_b64,
+        task=task,
+        rubric=rubric,
+        reference_images=reference_images,
+    )
+    resp = client.messages.create(**params)
+    return _result_from_raw(response_text(resp.content), refs_used)
+
+
+async def judge_fl_visual_async(
+    *,
+    client: Any,
+    model: str,
+    final_screenshot_b64: str,
+    task: str,
+    rubric: str,
+    reference_images: Sequence[Path] = (),
+) -> VisualJudgeResult:
+    """
+    judge_fl_visual for an AsyncAnthropic client; pair with fl_state.gather_bounded.
+    """
+    params, refs_used = _judge_params(
+        model=model,
+        final_screenshot_b64=final_screenshot_b64,
+        task=task,
+        rubric=rubric,
+        reference_images=reference_images,
+    )
+    resp = await client.messages.create(**params)
+    return _result_from_raw(response_text(resp.content), refs_used)
+
+
+def judge_fl_visual_batch(
+    *,
+    client: Any,
+    model: str,
+    requests: Sequence[dict[str, str]],
+    reference_images: Sequence[Path] = (),
+    poll_interval_s: float = BATCH_POLL_INTERVAL_S,
+) -> dict[str, VisualJudgeResult]:
+    """
+    Batch variant of judge_fl_visual for offline sweeps.
+
+    Each request needs `custom_id`, `final_screenshot_b64`, `task` and `rubric`;
+    every request shares the same reference images. Returns custom_id -> result.
+    """
+    batch_requests: list[dict[str, Any]] = []
+    refs_used: list[str] = []
+    for req in requests:
+        params, refs_used = _judge_params(
+            model=model,
+            final_screenshot_b64=req["final_screenshot_b64"],
+            task=req["task"],
+            rubric=req["rubric"],
+            reference_images=reference_images,
+        )
+        batch_requests.append({"custom_id": req["custom_id"], "params": params})
+    raw_by_id = run_message_batch(client, batch_requests, poll_interval_s=poll_interval_s)
+    return {
+        custom_id: (
+            _unparseable_result("visual_judge_batch_failed", "", refs_used)
+            if raw is None
+            else _result_from_raw(raw, refs_used)
+        )
+        for custom_id, raw in raw_by_id.items()
+    }
@@ -0,0 +1,23 @@
+"""
+JSON parsing for hot paths (LLM replies, event logs, lessons).
+
+Uses orjson when it happens to be installed and falls back to the stdlib
+otherwise; orjson is not a requirement. orjson.JSONDecodeError subclasses
+json.JSONDecodeError, so callers keep catching the stdlib exception.
+Writers stay on json.dumps so on-disk output (ensure_ascii, spacing) is
+identical either way.
+"""
+
+from __future__ import annotations
+
+import json
+
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+# One shared decoder for embedded-JSON scans (orjson has no raw_decode).
+raw_decode = json.JSONDecoder().raw_decode
+
+__all__ = ["loads", "raw_decode"]
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import functools
+import heapq
 import json
+import re
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
+
+import json_compat
 
 
 LESSONS_PATH = Path("learning/lessons.jsonl")
@@ -16,40 +21,70 @@ PERMISSION_NOISE_TERMS = (
     "cgpreflightposteventaccess",
     "window not found",
 )
+_PERMISSION_NOISE_RE = re.compile("|".join(re.escape(t) for t in PERMISSION_NOISE_TERMS))
+
 
+# Underscore counts as \w, so exclude it explicitly to match str.isalnum().
+_NON_ALNUM_RE = re.compile(r"[\W_]+")
 
-def _tokenize(text: str) -> set[str]:
-    normalized = "".join(ch.lower() if ch.isalnum() else " " for ch in text)
-    return {tok for tok in normalized.split() if tok}
 
+@functools.lru_cache(maxsize=4096)
+def _tokenize(text: str) -> frozenset[str]:
+    # Cached: the same lesson/task strings are scored against every task.
+    return frozenset(_NON_ALNUM_RE.sub(" ", text.lower()).split())
 
-def _jaccard(a: str, b: str) -> float:
-    ta = _tokenize(a)
-    tb = _tokenize(b)
+
+def _jaccard(ta: frozenset[str], tb: frozenset[str]) -> float:
     if not ta or not tb:
         return 0.0
     return len(ta & tb) / float(len(ta | tb))
 
 
+def _is_near_duplicate(tokens: frozenset[str], seen: list[frozenset[str]], *, threshold: float) -> bool:
+    n = len(tokens)
+    for other in seen:
+        m = len(other)
+        # Jaccard can't exceed min/max of the set sizes, so most pairs are
+        # rejected by an int compare before any set intersection is built.
+        if not n or not m or min(n, m) <= threshold * max(n, m):
+            continue
+        if _jaccard(tokens, other) > threshold:
+            return True
+    return False
+
+
 def _extract_json_array(raw: str) -> list[dict[str, Any]]:
     text = raw.strip()
     if not text:
         return []
     if text.startswith("[") and text.endswith("]"):
         try:
-            parsed = json.loads(text)
-            return parsed if isinstance(parsed, list) else []
+            parsed = json_compat.loads(text)
+            if isinstance(parsed, list):
+                return parsed
         except json.JSONDecodeError:
-            return []
+            pass
+    # Same scan as the _extract_json_object helpers: first complete array wins.
     start = text.find("[")
-    end = text.rfind("]")
-    if start == -1 or end == -1 or end <= start:
-        return []
-    try:
-        parsed = json.loads(text[start : end + 1])
+    while start != -1:
+        try:
+            parsed, _ = json_compat.raw_decode(text, start)
+        except json.JSONDecodeError:
+            start = text.find("[", start + 1)
+            continue
         return parsed if isinstance(parsed, list) else []
-    except json.JSONDecodeError:
-        return []
+    return []
+
+
+def _iter_jsonl_rows(lines: Iterable[bytes]) -> Iterator[Any]:
+    # Stream the file line by line; loads accepts UTF-8 bytes directly.
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json_compat.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
 
 
 @dataclass(frozen=True)
@@ -82,51 +117,45 @@ def load_lessons(*, path: Path = LESSONS_PATH) -> list[Lesson]:
     if not path.exists():
         return []
     lessons: list[Lesson] = []
-    for line in path.read_text(encoding="utf-8").splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            row = json.loads(line)
-        except json.JSONDecodeError:
-            continue
-        if not isinstance(row, dict):
-            continue
-        category = str(row.get("category", "insight")).strip().lower()
-        if category not in ALLOWED_CATEGORIES:
-            category = "insight"
-        lesson = " ".join(str(row.get("lesson", "")).split())
-        if not lesson:
-            continue
-        raw_steps = row.get("evidence_steps", [])
-        steps: list[int] = []
-        if isinstance(raw_steps, list):
-            for s in raw_steps:
-                if isinstance(s, int) and s > 0:
-                    steps.append(s)
-        raw_refs = row.get("skill_refs_used", [])
-        refs = [str(r).strip() for r in raw_refs if isinstance(r, str) and str(r).strip()]
-        try:
-            session_id = int(row.get("session_id", 0))
-        except (TypeError, ValueError):
-            session_id = 0
-        try:
-            eval_score = float(row.get("eval_score", 0.0))
-        except (TypeError, ValueError):
-            eval_score = 0.0
-        lessons.append(
-            Lesson(
-                session_id=max(0, session_id),
-                task=str(row.get("task", "")).strip(),
-                category=category,
-                lesson=lesson,
-                evidence_steps=steps[:8],
-                eval_passed=bool(row.get("eval_passed", False)),
-                eval_score=eval_score,
-                skill_refs_used=refs[:8],
-                timestamp=str(row.get("timestamp", "")) or datetime.now(timezone.utc).isoformat(),
+    with path.open("rb") as f:
+        for row in _iter_jsonl_rows(f):
+            if not isinstance(row, dict):
+                continue
+            category = str(row.get("category", "insight")).strip().lower()
+            if category not in ALLOWED_CATEGORIES:
+                category = "insight"
+            lesson = " ".join(str(row.get("lesson", "")).split())
+            if not lesson:
+                continue
+            raw_steps = row.get("evidence_steps", [])
+            steps: list[int] = []
+            if isinstance(raw_steps, list):
+                for s in raw_steps:
+                    if isinstance(s, int) and s > 0:
+                        steps.append(s)
+            raw_refs = row.get("skill_refs_used", [])
+            refs = [str(r).strip() for r in raw_refs if isinstance(r, str) and str(r).strip()]
+            try:
+                session_id = int(row.get("session_id", 0))
+            except (TypeError, ValueError):
+                session_id = 0
+            try:
+                eval_score = float(row.get("eval_score", 0.0))
+            except (TypeError, ValueError):
+                eval_score = 0.0
+            lessons.append(
+                Lesson(
+                    session_id=max(0, session_id),
+                    task=str(row.get("task", "")).strip(),
+                    category=category,
+                    lesson=lesson,
+                    evidence_steps=steps[:8],
+                    eval_passed=bool(row.get("eval_passed", False)),
+                    eval_score=eval_score,
+                    skill_refs_used=refs[:8],
+                    timestamp=str(row.get("timestamp", "")) or datetime.now(timezone.utc).isoformat(),
+                )
             )
-        )
     return lessons
 
 
@@ -138,35 +167,129 @@ def store_lessons(
     if not lessons:
         return 0
     path.parent.mkdir(parents=True, exist_ok=True)
+    payload = "".join(json.dumps(lesson.to_dict(), ensure_ascii=True) + "\n" for lesson in lessons)
     with path.open("a", encoding="utf-8") as f:
-        for lesson in lessons:
-            f.write(json.dumps(lesson.to_dict(), ensure_ascii=True) + "\n")
+        f.write(payload)
     return len(lessons)
 
 
-def _score_lesson_relevance(task: str, lesson: Lesson) -> float:
-    score = _jaccard(task, lesson.task) + (0.6 * _jaccard(task, lesson.lesson))
-    if "fl studio" in task.lower() and "fl studio" in lesson.task.lower():
-        score += 0.15
-    if "drum" in task.lower() and ("drum" in lesson.task.lower() or "kick" in lesson.lesson.lower()):
-        score += 0.15
-    return score
-
-
 def _is_permission_noise(lesson: Lesson) -> bool:
     text = f"{lesson.task} {lesson.lesson}".lower()
-    return any(tok in text for tok in PERMISSION_NOISE_TERMS)
+    return _PERMISSION_NOISE_RE.search(text) is not None
 
 
-def _lesson_quality_score(lesson: Lesson) -> float:
+def _lesson_quality_score(lesson: Lesson, *, noise: bool | None = None) -> float:
     quality = float(lesson.eval_score)
     if lesson.eval_passed:
         quality += 0.25
-    if _is_permission_noise(lesson):
+    if noise is None:
+        noise = _is_permission_noise(lesson)
+    if noise:
         quality -= 0.4
     return quality
 
 
+@dataclass(frozen=True)
+class _LessonIndex:
+    """
+    Column-wise (struct-of-arrays) view of the scoring inputs, one entry per lesson.
+
+    Everything here depends only on the lessons file, so it is built once per
+    file version and each query just walks the columns.
+    """
+
+    lessons: tuple[Lesson, ...]
+    task_tokens: tuple[frozenset[str], ...]
+    lesson_tokens: tuple[frozenset[str], ...]
+    has_fl: tuple[bool, ...]
+    has_drum: tuple[bool, ...]
+    noise: tuple[bool, ...]
+    quality: tuple[float, ...]
+    # token -> indices of lessons containing it, for overlap counting.
+    task_postings: dict[str, tuple[int, ...]]
+    lesson_postings: dict[str, tuple[int, ...]]
+
+
+def _postings(token_sets: tuple[frozenset[str], ...]) -> dict[str, tuple[int, ...]]:
+    out: dict[str, list[int]] = {}
+    for i, tokens in enumerate(token_sets):
+        for tok in tokens:
+            out.setdefault(tok, []).append(i)
+    return {tok: tuple(ids) for tok, ids in out.items()}
+
+
+def _jaccard_all(
+    query: frozenset[str],
+    token_sets: tuple[frozenset[str], ...],
+    postings: dict[str, tuple[int, ...]],
+) -> list[float]:
+    """
+    Jaccard of `query` against every set, via posting-list overlap counts.
+
+    Only lessons that share a token with the query are touched, and no
+    intersection/union sets are built: |a | b| = |a| + |b| - |a & b|.
+    """
+    inter = [0] * len(token_sets)
+    for tok in query:
+        for i in postings.get(tok, ()):
+            inter[i] += 1
+    nq = len(query)
+    return [
+        n / float(nq + len(token_sets[i]) - n) if n else 0.0
+        for i, n in enumerate(inter)
+    ]
+
+
+def _build_lesson_index(lessons: list[Lesson]) -> _LessonIndex:
+    noise = tuple(_is_permission_noise(l) for l in lessons)
+    task_tokens = tuple(_tokenize(l.task) for l in lessons)
+    lesson_tokens = tuple(_tokenize(l.lesson) for l in lessons)
+    return _LessonIndex(
+        lessons=tuple(lessons),
+        task_tokens=task_tokens,
+        lesson_tokens=lesson_tokens,
+        has_fl=tuple("fl studio" in l.task.lower() for l in lessons),
+        has_drum=tuple("drum" in l.task.lower() or "kick" in l.lesson.lower() for l in lessons),
+        noise=noise,
+        quality=tuple(_lesson_quality_score(l, noise=n) for l, n in zip(lessons, noise)),
+        task_postings=_postings(task_tokens),
+        lesson_postings=_postings(lesson_tokens),
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_lesson_index(path_str: str, mtime_ns: int, size: int) -> _LessonIndex:
+    # mtime_ns/size are only part of the cache key so appends are picked up.
+    return _build_lesson_index(load_lessons(path=Path(path_str)))
+
+
+def _load_lesson_index(path: Path) -> _LessonIndex | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return _cached_lesson_index(str(path), st.st_mtime_ns, st.st_size)
+
+
+def _scored_key(item: tuple[float, Lesson]) -> tuple[float, str]:
+    return item[0], item[1].timestamp
+
+
+def _ranked(scored: list[tuple[float, Lesson]], *, head: int) -> Iterator[tuple[float, Lesson]]:
+    """
+    Yield `scored` best-first, heap-selecting only the first `head` items.
+
+    Selection usually stops within the first few candidates, so the full sort
+    only runs if the session cap / dedup filters reject most of the head.
+    """
+    if len(scored) <= head:
+        yield from sorted(scored, key=_scored_key, reverse=True)
+        return
+    # nlargest(n) is documented to equal sorted(..., reverse=True)[:n], ties included.
+    yield from heapq.nlargest(head, scored, key=_scored_key)
+    yield from sorted(scored, key=_scored_key, reverse=True)[head:]
+
+
 def load_relevant_lessons(
     task: str,
     *,
@@ -174,18 +297,35 @@ def load_relevant_lessons(
     max_sessions: int = 5,
     path: Path = LESSONS_PATH,
 ) -> tuple[str, int]:
-    all_lessons = load_lessons(path=path)
-    if not all_lessons:
+    index = _load_lesson_index(path)
+    if index is None or not index.lessons:
         return "No prior lessons loaded.", 0
 
     scored: list[tuple[float, Lesson]] = []
     task_lower = task.lower()
-    for lesson in all_lessons:
-        # Avoid stale environment blockers being replayed in normal FL runs.
-        if "fl studio" in task_lower and _is_permission_noise(lesson) and "permission" not in task_lower:
+    task_tokens = _tokenize(task)
+    # Avoid stale environment blockers being replayed in normal FL runs.
+    skip_noise = "fl studio" in task_lower and "permission" not in task_lower
+    fl_bonus = 0.15 if "fl studio" in task_lower else 0.0
+    drum_bonus = 0.15 if "drum" in task_lower else 0.0
+    task_sim = _jaccard_all(task_tokens, index.task_tokens, index.task_postings)
+    lesson_sim = _jaccard_all(task_tokens, index.lesson_tokens, index.lesson_postings)
+    for lesson, t_sim, l_sim, has_fl, has_drum, noise, quality in zip(
+        index.lessons,
+        task_sim,
+        lesson_sim,
+        index.has_fl,
+        index.has_drum,
+        index.noise,
+        index.quality,
+    ):
+        if skip_noise and noise:
             continue
-        rel = _score_lesson_relevance(task, lesson)
-        quality = _lesson_quality_score(lesson)
+        rel = t_sim + (0.6 * l_sim)
+        if has_fl:
+            rel += fl_bonus
+        if has_drum:
+            rel += drum_bonus
         if rel > 0:
             if quality < 0.0:
                 continue
@@ -193,18 +333,17 @@ def load_relevant_lessons(
     if not scored:
         return "No prior lessons loaded.", 0
 
-    scored.sort(key=lambda item: (item[0], item[1].timestamp), reverse=True)
-
     selected: list[Lesson] = []
     used_sessions: set[int] = set()
-    selected_texts: list[str] = []
-    for _, lesson in scored:
+    selected_tokens: list[frozenset[str]] = []
+    for _, lesson in _ranked(scored, head=max_lessons * 4):
         if lesson.session_id and len(used_sessions) >= max_sessions and lesson.session_id not in used_sessions:
             continue
-        if any(_jaccard(lesson.lesson, seen) > 0.86 for seen in selected_texts):
+        lesson_tokens = _tokenize(lesson.lesson)
+        if _is_near_duplicate(lesson_tokens, selected_tokens, threshold=0.86):
             continue
         selected.append(lesson)
-        selected_texts.append(lesson.lesson)
+        selected_tokens.append(lesson_tokens)
         if lesson.session_id:
             used_sessions.add(lesson.session_id)
         if len(selected) >= max_lessons:
@@ -4,7 +4,7 @@ import json
 import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
 
 
 @dataclass(frozen=True)
@@ -35,11 +35,62 @@ def ensure_session(session_id: int, *, reset_existing: bool = True) -> SessionPa
     return SessionPaths(session_dir=session_dir, jsonl_path=jsonl_path, metrics_path=metrics_path)
 
 
-def write_event(jsonl_path: Path, event: dict[str, Any]) -> None:
+def encode_event(event: dict[str, Any]) -> str:
+    """
+    Serialize one event as a JSONL line (stamping `ts` if missing).
+    """
     event = dict(event)
     event.setdefault("ts", time.time())
+    return json.dumps(event, ensure_ascii=True) + "\n"
+
+
+def write_event(jsonl_path: Path, event: dict[str, Any] | str) -> None:
+    write_events(jsonl_path, [event])
+
+
+def write_events(jsonl_path: Path, events: Iterable[dict[str, Any] | str]) -> int:
+    """
+    Append events in a single write(); str items are lines already built by encode_event.
+    """
+    lines = [e if isinstance(e, str) else encode_event(e) for e in events]
+    if not lines:
+        return 0
     with jsonl_path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(event, ensure_ascii=True) + "\n")
+        f.write("".join(lines))
+    return len(lines)
+
+
+class EventWriter:
+    """
+    Append-mode JSONL writer that keeps one file handle open for a whole run.
+
+    write_event() reopens the file for every event; the agent loop logs each tool
+    call, so it uses this instead and closes it before reading the events back.
+    """
+
+    def __init__(self, jsonl_path: Path, *, flush_interval_s: float = 1.0) -> None:
+        self.jsonl_path = jsonl_path
+        self._fh = jsonl_path.open("a", encoding="utf-8")
+        self._flush_interval_s = flush_interval_s
+        self._last_flush = time.monotonic()
+
+    def write(self, event: dict[str, Any] | str) -> None:
+        self._fh.write(event if isinstance(event, str) else encode_event(event))
+        # Bound how much a crash can lose without paying a flush per event.
+        now = time.monotonic()
+        if now - self._last_flush >= self._flush_interval_s:
+            self._fh.flush()
+            self._last_flush = now
+
+    def close(self) -> None:
+        if not self._fh.closed:
+            self._fh.close()
+
+    def __enter__(self) -> EventWriter:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
 
 
 def write_metrics(metrics_path: Path, metrics: dict[str, Any]) -> None:
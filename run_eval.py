@@ -1,17 +1,36 @@
 from __future__ import annotations
 
-import json
+import functools
+import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Mapping
+
+import json_compat
 
 
 INSPECTION_ACTIONS = {"zoom", "mouse_move"}
 DECISIVE_ACTIONS = {"left_click", "key"}
 DEFAULT_DRUM_CONTRACT_PATH = Path("skills/fl-studio/drum-pattern/CONTRACT.json")
+# Every reason the evaluator can emit, in sorted order; bit i is _REASON_CODES[i],
+# so reading the set bits low to high yields a sorted, de-duplicated list.
+_REASON_CODES = (
+    "inspection_loop",
+    "insufficient_step_clicks",
+    "non_monotonic_step_order",
+    "selector_zone_misclick",
+    "step_spacing_out_of_range",
+)
+_REASON_BIT = {name: 1 << i for i, name in enumerate(_REASON_CODES)}
+# Exact-type sets for coordinate validation (bool kept: isinstance(True, int)).
+_COORD_SEQ_TYPES = frozenset((list, tuple))
+_COORD_NUM_TYPES = frozenset((int, float, bool))
+# Steps 1..16 map to bits 0..15; four-on-the-floor is steps 1, 5, 9, 13.
+_FOUR_ON_FLOOR_MASK = (1 << 0) | (1 << 4) | (1 << 8) | (1 << 12)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DrumRunEvaluation:
     applicable: bool
     passed: bool
@@ -79,30 +98,123 @@ def _default_drum_contract() -> dict[str, Any]:
     }
 
 
-def load_contract(path: Path = DEFAULT_DRUM_CONTRACT_PATH) -> dict[str, Any]:
-    if not path.exists():
-        return _default_drum_contract()
+_DEFAULT_CONTRACT: Mapping[str, Any] = MappingProxyType(_default_drum_contract())
+
+
+@functools.lru_cache(maxsize=8)
+def _load_contract_cached(path_str: str, mtime_ns: int, size: int) -> Mapping[str, Any]:
+    # mtime_ns/size are only part of the cache key so an edited contract is re-read.
     try:
-        raw = json.loads(path.read_text(encoding="utf-8"))
+        raw = json_compat.loads(Path(path_str).read_bytes())
         if isinstance(raw, dict):
-            return raw
+            return MappingProxyType(raw)
     except Exception:
         pass
-    return _default_drum_contract()
+    return _DEFAULT_CONTRACT
+
+
+def _contract_key(path: Path) -> tuple[str, int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return str(path), st.st_mtime_ns, st.st_size
+
+
+def load_contract(path: Path = DEFAULT_DRUM_CONTRACT_PATH) -> Mapping[str, Any]:
+    """
+    Load the drum contract, parsed once per file version (read-only view).
+    """
+    key = _contract_key(path)
+    return _DEFAULT_CONTRACT if key is None else _load_contract_cached(*key)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledContract:
+    """
+    Contract signals coerced to typed values once, for the per-run evaluator.
+    """
+
+    # task_match: None when the contract's task_match is malformed (never matches).
+    all_terms: tuple[str, ...] | None
+    any_terms_re: re.Pattern[str] | None
+    y_min: int
+    y_max: int
+    required_clicks: int
+    selector_x_lt: int
+    ratio_max: float
+    require_monotonic_x: bool
+    diff_min: tuple[int, int, int]
+    diff_max: tuple[int, int, int]
+
+
+def _compile_contract(contract: Mapping[str, Any]) -> CompiledContract:
+    signals = contract.get("signals", {}) if isinstance(contract.get("signals"), dict) else {}
+    click_band = signals.get("click_band", {}) if isinstance(signals.get("click_band"), dict) else {}
+    selector_strip = signals.get("selector_strip", {}) if isinstance(signals.get("selector_strip"), dict) else {}
+    step_spacing = signals.get("step_spacing", {}) if isinstance(signals.get("step_spacing"), dict) else {}
+    inspection = signals.get("inspection_ratio", {}) if isinstance(signals.get("inspection_ratio"), dict) else {}
 
+    diff_min_raw = step_spacing.get("diff_min", [40, 55, 55])
+    diff_max_raw = step_spacing.get("diff_max", [90, 90, 90])
+    diff_min = [int(v) for v in diff_min_raw] if isinstance(diff_min_raw, list) else [40, 55, 55]
+    diff_max = [int(v) for v in diff_max_raw] if isinstance(diff_max_raw, list) else [90, 90, 90]
+    if len(diff_min) < 3:
+        diff_min = (diff_min + [55, 55, 55])[:3]
+    if len(diff_max) < 3:
+        diff_max = (diff_max + [90, 90, 90])[:3]
 
-def _task_matches(task: str, contract: dict[str, Any]) -> bool:
     tm = contract.get("task_match", {})
-    if not isinstance(tm, dict):
-        return False
-    lower = task.lower()
-    all_terms = [str(t).lower() for t in tm.get("all", []) if str(t).strip()]
-    any_terms = [str(t).lower() for t in tm.get("any", []) if str(t).strip()]
-    if all_terms and not all(t in lower for t in all_terms):
+    all_terms: tuple[str, ...] | None = None
+    any_terms_re: re.Pattern[str] | None = None
+    if isinstance(tm, dict):
+        all_terms = tuple(str(t).lower() for t in tm.get("all", []) if str(t).strip())
+        any_terms = [str(t).lower() for t in tm.get("any", []) if str(t).strip()]
+        if any_terms:
+            # One alternation scans the task once instead of one substring scan per term.
+            any_terms_re = re.compile("|".join(re.escape(t) for t in any_terms))
+
+    return CompiledContract(
+        all_terms=all_terms,
+        any_terms_re=any_terms_re,
+        y_min=int(click_band.get("y_min", 130)),
+        y_max=int(click_band.get("y_max", 170)),
+        required_clicks=int(click_band.get("required_clicks", 4)),
+        selector_x_lt=int(selector_strip.get("x_lt", 420)),
+        ratio_max=float(inspection.get("max_zoom_per_decisive", 1.0)),
+        require_monotonic_x=bool(step_spacing.get("require_monotonic_x", True)),
+        diff_min=(diff_min[0], diff_min[1], diff_min[2]),
+        diff_max=(diff_max[0], diff_max[1], diff_max[2]),
+    )
+
+
+_DEFAULT_COMPILED_CONTRACT = _compile_contract(_DEFAULT_CONTRACT)
+
+
+@functools.lru_cache(maxsize=8)
+def _compiled_contract_cached(path_str: str, mtime_ns: int, size: int) -> CompiledContract:
+    return _compile_contract(_load_contract_cached(path_str, mtime_ns, size))
+
+
+def load_compiled_contract(path: Path = DEFAULT_DRUM_CONTRACT_PATH) -> CompiledContract:
+    key = _contract_key(path)
+    return _DEFAULT_COMPILED_CONTRACT if key is None else _compiled_contract_cached(*key)
+
+
+# Sweeps score many sessions against the same task string (self_improve falls
+# back to one default task), so the lowered copy is reused across calls.
+@functools.lru_cache(maxsize=32)
+def _lower_task(task: str) -> str:
+    return task.lower()
+
+
+def _task_matches(task: str, cc: CompiledContract) -> bool:
+    if cc.all_terms is None:
         return False
-    if any_terms and not any(t in lower for t in any_terms):
+    lower = _lower_task(task)
+    if not all(t in lower for t in cc.all_terms):
         return False
-    return True
+    return cc.any_terms_re is None or cc.any_terms_re.search(lower) is not None
 
 
 def evaluate_drum_run(
@@ -111,9 +223,10 @@ def evaluate_drum_run(
     *,
     contract_path: Path = DEFAULT_DRUM_CONTRACT_PATH,
 ) -> DrumRunEvaluation:
-    contract = load_contract(contract_path)
+    cc = load_compiled_contract(contract_path)
     cpath = str(contract_path)
-    if not _task_matches(task, contract):
+    # Task match is the first gate; non-drum runs never touch their events.
+    if not _task_matches(task, cc):
         return DrumRunEvaluation(
             applicable=False,
             passed=False,
@@ -127,88 +240,118 @@ def evaluate_drum_run(
             state_active_steps=[],
             contract_path=cpath,
         )
+    return evaluate_drum_events(events, cc, contract_path=cpath)
 
-    def _extract_state_payload(ev: dict[str, Any]) -> dict[str, Any] | None:
-        if ev.get("tool") != "extract_fl_state":
+
+def _extract_state_payload(ev: dict[str, Any]) -> dict[str, Any] | None:
+    if not ev.get("ok"):
+        return None
+    out = ev.get("output")
+    # Events are decoded JSON, so exact type checks suffice (no subclasses).
+    out_type = type(out)
+    if out_type is dict:
+        return out
+    if out_type is str:
+        text = out.strip()
+        # Only an object can be a state payload; skip parsing anything else.
+        if not text.startswith("{"):
             return None
-        if not bool(ev.get("ok")):
+        try:
+            parsed = json_compat.loads(text)
+        except Exception:
             return None
-        out = ev.get("output")
-        if isinstance(out, dict):
-            return out
-        if isinstance(out, str):
-            text = out.strip()
-            if not text:
-                return None
-            try:
-                parsed = json.loads(text)
-            except Exception:
-                return None
-            return parsed if isinstance(parsed, dict) else None
-        return None
+        return parsed if isinstance(parsed, dict) else None
+    return None
 
-    signals = contract.get("signals", {}) if isinstance(contract.get("signals"), dict) else {}
-    click_band = signals.get("click_band", {}) if isinstance(signals.get("click_band"), dict) else {}
-    selector_strip = signals.get("selector_strip", {}) if isinstance(signals.get("selector_strip"), dict) else {}
-    step_spacing = signals.get("step_spacing", {}) if isinstance(signals.get("step_spacing"), dict) else {}
-    inspection = signals.get("inspection_ratio", {}) if isinstance(signals.get("inspection_ratio"), dict) else {}
 
-    y_min = int(click_band.get("y_min", 130))
-    y_max = int(click_band.get("y_max", 170))
-    required_clicks = int(click_band.get("required_clicks", 4))
-    selector_x_lt = int(selector_strip.get("x_lt", 420))
-    ratio_max = float(inspection.get("max_zoom_per_decisive", 1.0))
-    require_monotonic_x = bool(step_spacing.get("require_monotonic_x", True))
+def _step_mask(items: Any) -> int:
+    mask = 0
+    if isinstance(items, list):
+        for item in items:
+            if isinstance(item, int) and 1 <= item <= 16:
+                mask |= 1 << (item - 1)
+    return mask
 
-    diff_min_raw = step_spacing.get("diff_min", [40, 55, 55])
-    diff_max_raw = step_spacing.get("diff_max", [90, 90, 90])
-    diff_min = [int(v) for v in diff_min_raw] if isinstance(diff_min_raw, list) else [40, 55, 55]
-    diff_max = [int(v) for v in diff_max_raw] if isinstance(diff_max_raw, list) else [90, 90, 90]
-    if len(diff_min) < 3:
-        diff_min = (diff_min + [55, 55, 55])[:3]
-    if len(diff_max) < 3:
-        diff_max = (diff_max + [90, 90, 90])[:3]
 
-    clicks: list[dict[str, int]] = []
+def evaluate_drum_events(
+    events: list[dict[str, Any]],
+    cc: CompiledContract,
+    *,
+    contract_path: str = str(DEFAULT_DRUM_CONTRACT_PATH),
+) -> DrumRunEvaluation:
+    """
+    Score a run's events against an already-compiled contract (task match is the caller's job).
+    """
+    y_min = cc.y_min
+    y_max = cc.y_max
+    required_clicks = cc.required_clicks
+    diff_min = cc.diff_min
+    diff_max = cc.diff_max
+
+    # Band clicks are kept column-wise (step/x/y) and only turned into dicts
+    # for the result; the checks below work on the x column directly.
+    click_steps: list[int] = []
+    xs: list[int] = []
+    ys: list[int] = []
     zoom_count = 0
     decisive_count = 0
     latest_state_step = 0
     latest_state_payload: dict[str, Any] | None = None
 
+    inspection_actions = INSPECTION_ACTIONS
+    decisive_actions = DECISIVE_ACTIONS
+    seq_types = _COORD_SEQ_TYPES
+    num_types = _COORD_NUM_TYPES
+    add_step = click_steps.append
+    add_x = xs.append
+    add_y = ys.append
+    get = dict.get
     for ev in events:
-        state_payload = _extract_state_payload(ev)
-        if state_payload is not None:
-            s = int(ev.get("step", 0) or 0)
-            if s >= latest_state_step:
-                latest_state_step = s
-                latest_state_payload = state_payload
-        if ev.get("tool") != "computer":
+        tool = get(ev, "tool")
+        if tool != "computer":
+            if tool == "extract_fl_state":
+                state_payload = _extract_state_payload(ev)
+                if state_payload is not None:
+                    s = int(ev.get("step", 0) or 0)
+                    if s >= latest_state_step:
+                        latest_state_step = s
+                        latest_state_payload = state_payload
             continue
-        tool_input = ev.get("tool_input")
-        if not isinstance(tool_input, dict):
+        # Computer events almost always carry a dict tool_input with an action;
+        # let the rare malformed one raise instead of type-checking every event.
+        try:
+            tool_input = ev["tool_input"]
+            action = tool_input["action"]
+        except (KeyError, TypeError):
             continue
-        action = tool_input.get("action")
-        if action in INSPECTION_ACTIONS:
+        # Each action lands in at most one bucket and left_click is decisive, so
+        # inspection and non-decisive actions are done after one set probe.
+        if action in inspection_actions:
             zoom_count += 1
-        if action in DECISIVE_ACTIONS:
-            decisive_count += 1
+            continue
+        if action not in decisive_actions:
+            continue
+        decisive_count += 1
 
-        if action != "left_click":
+        # Only the first `required_clicks` band clicks are scored; later ones
+        # still count toward the decisive total above.
+        if action != "left_click" or len(xs) >= required_clicks:
             continue
         coord = tool_input.get("coordinate")
-        if not (isinstance(coord, list) and len(coord) == 2):
+        if type(coord) not in seq_types or len(coord) != 2:
             continue
-        x_raw, y_raw = coord[0], coord[1]
-        if not isinstance(x_raw, (int, float)) or not isinstance(y_raw, (int, float)):
+        x_raw, y_raw = coord
+        if type(x_raw) not in num_types or type(y_raw) not in num_types:
             continue
         x = int(x_raw)
         y = int(y_raw)
         if y_min <= y <= y_max:
-            clicks.append({"step": int(ev.get("step", 0) or 0), "x": x, "y": y})
+            add_step(int(ev.get("step", 0) or 0))
+            add_x(x)
+            add_y(y)
 
-    first = clicks[:required_clicks]
-    xs = [c["x"] for c in first]
-    reasons: list[str] = []
+    first = [{"step": s, "x": x, "y": y} for s, x, y in zip(click_steps, xs, ys)]
+    reason_mask = 0
     outcomes = {
         "enough_clicks": len(first) >= required_clicks,
         "monotonic_step_order": True,
@@ -221,61 +364,46 @@ def evaluate_drum_run(
         four = latest_state_payload.get("four_on_floor")
         if isinstance(four, dict):
             active_match = bool(four.get("active_match", False))
-            active_steps = four.get("active_steps")
-            if isinstance(active_steps, list):
-                for item in active_steps:
-                    if isinstance(item, int) and 1 <= item <= 16:
-                        state_active_steps.append(item)
-            if not state_active_steps:
-                guessed = four.get("detected_steps")
-                if isinstance(guessed, list):
-                    for item in guessed:
-                        if isinstance(item, int) and 1 <= item <= 16:
-                            state_active_steps.append(item)
-            state_active_steps = sorted(set(state_active_steps))
+            mask = _step_mask(four.get("active_steps"))
+            if not mask:
+                mask = _step_mask(four.get("detected_steps"))
+            # Walking the bits low to high yields the steps already sorted and unique.
+            state_active_steps = [i + 1 for i in range(16) if mask >> i & 1]
             if active_match:
                 state_verified = True
-            elif state_active_steps:
-                target = {1, 5, 9, 13}
-                state_verified = target.issubset(set(state_active_steps))
+            elif mask:
+                state_verified = mask & _FOUR_ON_FLOOR_MASK == _FOUR_ON_FLOOR_MASK
 
     if len(first) < required_clicks:
-        reasons.append("insufficient_step_clicks")
+        reason_mask |= _REASON_BIT["insufficient_step_clicks"]
         outcomes["monotonic_step_order"] = False
         outcomes["spacing_in_range"] = False
     else:
-        if any(x < selector_x_lt for x in xs):
-            reasons.append("selector_zone_misclick")
-        if require_monotonic_x and xs != sorted(xs):
-            reasons.append("non_monotonic_step_order")
+        # Whole-column reductions instead of per-element generator branches:
+        # one min() answers "any click left of the selector" and "any step back".
+        if xs and min(xs) < cc.selector_x_lt:
+            reason_mask |= _REASON_BIT["selector_zone_misclick"]
+        diffs = [b - a for a, b in zip(xs, xs[1:])]
+        if cc.require_monotonic_x and min(diffs, default=0) < 0:
+            reason_mask |= _REASON_BIT["non_monotonic_step_order"]
             outcomes["monotonic_step_order"] = False
 
-        diffs = [xs[i + 1] - xs[i] for i in range(len(xs) - 1)]
         if len(diffs) == 3:
-            bounds_ok = all(diff_min[i] <= diffs[i] <= diff_max[i] for i in range(3))
+            bounds_ok = all(lo <= d <= hi for d, lo, hi in zip(diffs, diff_min, diff_max))
             if not bounds_ok:
-                reasons.append("step_spacing_out_of_range")
+                reason_mask |= _REASON_BIT["step_spacing_out_of_range"]
                 outcomes["spacing_in_range"] = False
 
-    if decisive_count > 0 and (zoom_count / float(decisive_count)) > ratio_max:
-        reasons.append("inspection_loop")
-
-    required_outcomes = contract.get("required_outcomes", [])
-    if isinstance(required_outcomes, list):
-        for name in required_outcomes:
-            if isinstance(name, str) and name in outcomes and not outcomes[name]:
-                # Reason tags already set above for our current outcome set.
-                pass
+    if decisive_count > 0 and (zoom_count / float(decisive_count)) > cc.ratio_max:
+        reason_mask |= _REASON_BIT["inspection_loop"]
 
-    forbidden_patterns = contract.get("forbidden_patterns", [])
-    forbidden_set = {x for x in forbidden_patterns if isinstance(x, str)}
-    unique_reasons = sorted(set(reasons))
-    if state_verified and "inspection_loop" in unique_reasons:
+    if state_verified:
         # If the final state proves success, inspection inefficiency should not hard-fail.
-        unique_reasons.remove("inspection_loop")
-    has_forbidden = any(r in forbidden_set for r in unique_reasons)
+        reason_mask &= ~_REASON_BIT["inspection_loop"]
+    unique_reasons = [name for i, name in enumerate(_REASON_CODES) if reason_mask >> i & 1]
     all_outcomes_ok = all(outcomes.values()) or state_verified
-    passed = all_outcomes_ok and not has_forbidden and len(unique_reasons) == 0
+    # Any reason fails the run, so forbidden_patterns need no separate check.
+    passed = all_outcomes_ok and reason_mask == 0
 
     score = max(0.0, 1.0 - (0.25 * len(unique_reasons)))
     if passed:
@@ -292,5 +420,5 @@ def evaluate_drum_run(
         state_verified=state_verified,
         state_step=latest_state_step,
         state_active_steps=state_active_steps,
-        contract_path=cpath,
+        contract_path=contract_path,
     )
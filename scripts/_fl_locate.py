@@ -0,0 +1,184 @@
+"""Shared FL Studio lookup and CGEvent helpers for the scripts/diag_* focus tests.
+
+Import from a script in this directory (`python scripts/diag_x.py` puts
+scripts/ on sys.path): `from _fl_locate import resolve_fl, cg_key, ...`.
+"""
+import select
+import sys
+import termios
+import time
+
+import Quartz  # type: ignore
+from AppKit import NSWorkspace  # type: ignore
+
+SPACE = 49
+
+# One private event source for every synthetic event, set up like computer_use's
+# _EVENT_SRC so these diagnostics exercise the same delivery path the agent uses.
+EVENT_SRC = Quartz.CGEventSourceCreate(Quartz.kCGEventSourceStatePrivate)
+Quartz.CGEventSourceSetLocalEventsSuppressionInterval(EVENT_SRC, 0.0)
+
+# NSWorkspace.sharedWorkspace() is a process-wide singleton; fetch it once.
+WORKSPACE = NSWorkspace.sharedWorkspace()
+
+# runningApplications() bridges every app proxy through PyObjC; lookups made
+# within a second of each other share one listing.
+_APPS_TTL_S = 1.0
+_apps_cache = (0.0, [])
+
+
+def running_apps():
+    global _apps_cache
+    ts, apps = _apps_cache
+    now = time.monotonic()
+    if not apps or now - ts >= _APPS_TTL_S:
+        apps = list(WORKSPACE.runningApplications())
+        _apps_cache = (now, apps)
+    return apps
+
+
+def get_frontmost() -> str:
+    f = WORKSPACE.frontmostApplication()
+    return f"{f.localizedName()} (pid={f.processIdentifier()})"
+
+
+def find_fl_app():
+    """Return FL Studio's NSRunningApplication, or None."""
+    for app in running_apps():
+        name = app.localizedName() or ""
+        bid = (app.bundleIdentifier() or "").lower()
+        if "FL Studio" in name or "flstudio" in bid or "fl-studio" in bid:
+            return app
+    return None
+
+
+def find_fl_window():
+    """Return (pid, bounds, owner) of FL Studio's main on-screen window, or None."""
+    # Owner filtering already skips desktop elements, so no exclude pass.
+    wl = Quartz.CGWindowListCopyWindowInfo(Quartz.kCGWindowListOptionOnScreenOnly, Quartz.kCGNullWindowID) or []
+    for w in wl:
+        owner = w.get("kCGWindowOwnerName", "")
+        if "FL Studio" not in owner and "OsxFL" not in owner:
+            continue
+        if int(w.get("kCGWindowLayer", 0)) != 0:
+            continue
+        b = w.get("kCGWindowBounds", {})
+        x, y = int(b.get("X", 0)), int(b.get("Y", 0))
+        ww, wh = int(b.get("Width", 0)), int(b.get("Height", 0))
+        if ww > 0 and wh > 0:
+            return int(w.get("kCGWindowOwnerPID", 0)), (x, y, ww, wh), owner
+    return None
+
+
+def resolve_fl():
+    """Return (pid, bounds, owner) for FL Studio from one window-list query.
+
+    The pid comes from the window's owner; running apps are only enumerated
+    when no FL Studio window is on screen.
+    """
+    found = find_fl_window()
+    if found is not None:
+        return found
+    app = find_fl_app()
+    if app is not None:
+        return app.processIdentifier(), None, None
+    return None, None, None
+
+
+def warp(x, y):
+    Quartz.CGWarpMouseCursorPosition(Quartz.CGPointMake(x, y))
+
+
+def wait_for_mouse(x, y, tol=5, timeout=0.3):
+    """Poll the cursor until it is within `tol` px of (x, y); return its final (x, y).
+
+    Gives up after `timeout` seconds, so callers still see where it ended up.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        loc = Quartz.CGEventGetLocation(Quartz.CGEventCreate(None))
+        if (abs(loc.x - x) < tol and abs(loc.y - y) < tol) or time.monotonic() >= deadline:
+            return loc.x, loc.y
+        time.sleep(0.01)
+
+
+def warp_if_away(x, y, tol=2):
+    """Warp to (x, y) unless the cursor is already within `tol` px; return True if it warped."""
+    loc = Quartz.CGEventGetLocation(Quartz.CGEventCreate(None))
+    if abs(loc.x - x) <= tol and abs(loc.y - y) <= tol:
+        return False
+    warp(x, y)
+    return True
+
+
+# Down->up hold for synthetic events. The deadline runs from the down post, so
+# building the up event (and any other work in between) comes out of the hold.
+KEY_HOLD_S = 0.05
+AX_KEY_HOLD_S = 0.02
+
+
+def hold_until(deadline):
+    """Run the current thread's CFRunLoop until `deadline` so posted events drain.
+
+    CFRunLoopRunInMode returns at once when the loop has no sources (the usual
+    case in these scripts), so whatever is left is slept off and the hold
+    length stays what the caller asked for.
+    """
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return
+    Quartz.CFRunLoopRunInMode(Quartz.kCFRunLoopDefaultMode, remaining, False)
+    remaining = deadline - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+
+
+def hold(seconds):
+    hold_until(time.monotonic() + seconds)
+
+
+def cg_click(x, y, tap=Quartz.kCGHIDEventTap):
+    pt = Quartz.CGPointMake(x, y)
+    down = Quartz.CGEventCreateMouseEvent(EVENT_SRC, Quartz.kCGEventLeftMouseDown, pt, Quartz.kCGMouseButtonLeft)
+    Quartz.CGEventPost(tap, down)
+    deadline = time.monotonic() + KEY_HOLD_S
+    up = Quartz.CGEventCreateMouseEvent(EVENT_SRC, Quartz.kCGEventLeftMouseUp, pt, Quartz.kCGMouseButtonLeft)
+    hold_until(deadline)
+    Quartz.CGEventPost(tap, up)
+
+
+def cg_key(keycode, tap=Quartz.kCGHIDEventTap):
+    down = Quartz.CGEventCreateKeyboardEvent(EVENT_SRC, keycode, True)
+    Quartz.CGEventPost(tap, down)
+    deadline = time.monotonic() + KEY_HOLD_S
+    up = Quartz.CGEventCreateKeyboardEvent(EVENT_SRC, keycode, False)
+    hold_until(deadline)
+    Quartz.CGEventPost(tap, up)
+
+
+def prompt(msg, timeout=30.0, default="n"):
+    """input() that gives up after `timeout` seconds and returns `default`.
+
+    Anything typed before the question is shown (e.g. a late answer to a prompt
+    that already timed out) is discarded, so it can't answer this one.
+    """
+    if sys.stdin.isatty():
+        termios.tcflush(sys.stdin, termios.TCIFLUSH)
+    print(msg, end="", flush=True)
+    ready, _, _ = select.select([sys.stdin], [], [], timeout)
+    if not ready:
+        if default is None:
+            print(f"(no answer in {timeout:.0f}s: TIMEOUT)")
+        else:
+            print(f"(no answer in {timeout:.0f}s, using {default!r})")
+        return default
+    line = sys.stdin.readline()
+    return line.rstrip("\n") if line else default
+
+
+def confirm(msg, timeout=30.0):
+    """Ask a y/n question: True for y, False for anything else, None on timeout."""
+    answer = prompt(msg, timeout=timeout, default=None)
+    if answer is None:
+        return None
+    return answer.strip().lower() == "y"
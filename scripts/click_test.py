@@ -13,10 +13,10 @@ from __future__ import annotations
 import sys
 import time
 from pathlib import Path
+from typing import Any
 
 import Quartz
-from AppKit import NSWorkspace
-from PIL import Image
+from AppKit import NSURL, NSWorkspace
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
@@ -24,47 +24,57 @@ _FL_BUNDLE_ID = "com.image-line.flstudio"
 _OUTDIR = Path("sessions/click-test")
 
 
-def find_fl_pid() -> int | None:
+# Cached NSRunningApplication; revalidated with isTerminated() on each use.
+_fl_app: Any | None = None
+
+
+def _find_fl_app() -> Any | None:
+    global _fl_app
+    if _fl_app is not None and not _fl_app.isTerminated():
+        return _fl_app
     ws = NSWorkspace.sharedWorkspace()
-    for app in ws.runningApplications():
-        if (app.bundleIdentifier() or "") == _FL_BUNDLE_ID:
-            return app.processIdentifier()
-    return None
+    _fl_app = next(
+        (app for app in ws.runningApplications() if (app.bundleIdentifier() or "") == _FL_BUNDLE_ID),
+        None,
+    )
+    return _fl_app
+
+
+def find_fl_pid() -> int | None:
+    app = _find_fl_app()
+    return app.processIdentifier() if app is not None else None
 
 
 def activate_fl_studio() -> None:
-    ws = NSWorkspace.sharedWorkspace()
-    for app in ws.runningApplications():
-        if (app.bundleIdentifier() or "") == _FL_BUNDLE_ID:
-            app.activateWithOptions_(3)
-            return
+    app = _find_fl_app()
+    if app is not None:
+        app.activateWithOptions_(3)
+
+
+def _fl_window_candidate(w: Any) -> tuple[int, tuple[int, int, int, int], int] | None:
+    try:
+        if w.get("kCGWindowOwnerName") not in ("FL Studio", "OsxFL"):
+            return None
+        if int(w.get("kCGWindowLayer", 0)) != 0:
+            return None
+        bounds = w.get("kCGWindowBounds") or {}
+        x = int(bounds.get("X", 0))
+        y = int(bounds.get("Y", 0))
+        ww = int(bounds.get("Width", 0))
+        wh = int(bounds.get("Height", 0))
+        wid = int(w.get("kCGWindowNumber"))
+    except Exception:
+        return None
+    if ww <= 0 or wh <= 0:
+        return None
+    return wid, (x, y, ww, wh), ww * wh
 
 
 def find_fl_window() -> tuple[int, tuple[int, int, int, int]] | None:
     options = Quartz.kCGWindowListOptionOnScreenOnly | Quartz.kCGWindowListExcludeDesktopElements
     window_list = Quartz.CGWindowListCopyWindowInfo(options, Quartz.kCGNullWindowID) or []
-    best = None
-    for w in window_list:
-        try:
-            owner = w.get("kCGWindowOwnerName")
-            layer = int(w.get("kCGWindowLayer", 0))
-            if owner not in ("FL Studio", "OsxFL"):
-                continue
-            if layer != 0:
-                continue
-            bounds = w.get("kCGWindowBounds") or {}
-            x = int(bounds.get("X", 0))
-            y = int(bounds.get("Y", 0))
-            ww = int(bounds.get("Width", 0))
-            wh = int(bounds.get("Height", 0))
-            wid = int(w.get("kCGWindowNumber"))
-            if ww <= 0 or wh <= 0:
-                continue
-            area = ww * wh
-            if best is None or area > best[2]:
-                best = (wid, (x, y, ww, wh), area)
-        except Exception:
-            continue
+    candidates = (c for c in map(_fl_window_candidate, window_list) if c is not None)
+    best = max(candidates, key=lambda c: c[2], default=None)
     if best is None:
         return None
     return best[0], best[1]
@@ -82,16 +92,14 @@ def capture_fl_window_png(wid: int, bounds: tuple[int, int, int, int], out_path:
     if cgimg is None:
         return False
 
-    width = Quartz.CGImageGetWidth(cgimg)
-    height = Quartz.CGImageGetHeight(cgimg)
-    bpr = Quartz.CGImageGetBytesPerRow(cgimg)
-    provider = Quartz.CGImageGetDataProvider(cgimg)
-    data = Quartz.CGDataProviderCopyData(provider)
-    buf = bytes(data)
-    img = Image.frombuffer("RGBA", (width, height), buf, "raw", "BGRA", bpr, 1).copy()
+    # Let ImageIO encode straight from the CGImage: no Python-side pixel copies.
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    img.save(out_path)
-    return True
+    url = NSURL.fileURLWithPath_(str(out_path))
+    dest = Quartz.CGImageDestinationCreateWithURL(url, "public.png", 1, None)
+    if dest is None:
+        return False
+    Quartz.CGImageDestinationAddImage(dest, cgimg, None)
+    return bool(Quartz.CGImageDestinationFinalize(dest))
 
 
 def post_key_to_pid(pid: int, keycode: int) -> None:
@@ -102,41 +110,57 @@ def post_key_to_pid(pid: int, keycode: int) -> None:
     Quartz.CGEventPostToPid(pid, up)
 
 
-def click_hid_tap(sx: int, sy: int) -> None:
+# HID-state event source for Method B; created once and reused across phases.
+_hid_source: Any | None = None
+
+
+def _get_hid_source() -> Any:
+    global _hid_source
+    if _hid_source is None:
+        _hid_source = Quartz.CGEventSourceCreate(Quartz.kCGEventSourceStateHIDSystemState)
+    return _hid_source
+
+
+_LEFT = (Quartz.kCGEventLeftMouseDown, Quartz.kCGEventLeftMouseUp, Quartz.kCGMouseButtonLeft)
+_RIGHT = (Quartz.kCGEventRightMouseDown, Quartz.kCGEventRightMouseUp, Quartz.kCGMouseButtonRight)
+
+
+def _post_mouse(
+    source: Any | None,
+    pid: int | None,
+    sx: int,
+    sy: int,
+    button: tuple[int, int, int],
+) -> None:
+    """Build one down/up pair and post it to the HID tap, or to `pid` if given."""
+    down_type, up_type, mouse_button = button
     pt = Quartz.CGPointMake(sx, sy)
-    down = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseDown, pt, Quartz.kCGMouseButtonLeft)
-    up = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseUp, pt, Quartz.kCGMouseButtonLeft)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, down)
-    time.sleep(0.05)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, up)
+    down = Quartz.CGEventCreateMouseEvent(source, down_type, pt, mouse_button)
+    up = Quartz.CGEventCreateMouseEvent(source, up_type, pt, mouse_button)
+    if pid is None:
+        Quartz.CGEventPost(Quartz.kCGHIDEventTap, down)
+        time.sleep(0.05)
+        Quartz.CGEventPost(Quartz.kCGHIDEventTap, up)
+    else:
+        Quartz.CGEventPostToPid(pid, down)
+        time.sleep(0.05)
+        Quartz.CGEventPostToPid(pid, up)
+
+
+def click_hid_tap(sx: int, sy: int) -> None:
+    _post_mouse(None, None, sx, sy, _LEFT)
 
 
 def click_hid_source(sx: int, sy: int) -> None:
-    source = Quartz.CGEventSourceCreate(Quartz.kCGEventSourceStateHIDSystemState)
-    pt = Quartz.CGPointMake(sx, sy)
-    down = Quartz.CGEventCreateMouseEvent(source, Quartz.kCGEventLeftMouseDown, pt, Quartz.kCGMouseButtonLeft)
-    up = Quartz.CGEventCreateMouseEvent(source, Quartz.kCGEventLeftMouseUp, pt, Quartz.kCGMouseButtonLeft)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, down)
-    time.sleep(0.05)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, up)
+    _post_mouse(_get_hid_source(), None, sx, sy, _LEFT)
 
 
 def click_to_pid(pid: int, sx: int, sy: int) -> None:
-    pt = Quartz.CGPointMake(sx, sy)
-    down = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseDown, pt, Quartz.kCGMouseButtonLeft)
-    up = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseUp, pt, Quartz.kCGMouseButtonLeft)
-    Quartz.CGEventPostToPid(pid, down)
-    time.sleep(0.05)
-    Quartz.CGEventPostToPid(pid, up)
+    _post_mouse(None, pid, sx, sy, _LEFT)
 
 
 def right_click_hid_tap(sx: int, sy: int) -> None:
-    pt = Quartz.CGPointMake(sx, sy)
-    down = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventRightMouseDown, pt, Quartz.kCGMouseButtonRight)
-    up = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventRightMouseUp, pt, Quartz.kCGMouseButtonRight)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, down)
-    time.sleep(0.05)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, up)
+    _post_mouse(None, None, sx, sy, _RIGHT)
 
 
 def main() -> int:
@@ -4,8 +4,28 @@ import subprocess
 import sys
 import time
 
+METHOD_HELP = {
+    "H": "AXUIElementPostKeyboardEvent (HIGHEST CONFIDENCE)",
+    "I": "Dock bounce activate trick",
+    "J": "CGEventPostToPid",
+    "A": "open -a + CGEvent key",
+    "D": "CGWarp + click + key",
+}
+
+
+def usage() -> int:
+    print(f"Usage: python {sys.argv[0]} <{'|'.join(METHOD_HELP)}>")
+    for key, desc in METHOD_HELP.items():
+        print(f"  {key} = {desc}")
+    return 1
+
+
+# Check argv before the PyObjC imports below: a missing or unknown method
+# prints usage without loading Quartz/AppKit.
+if __name__ == "__main__" and (len(sys.argv) < 2 or sys.argv[1].upper() not in METHOD_HELP):
+    raise SystemExit(usage())
+
 import Quartz  # type: ignore
-from AppKit import NSWorkspace  # type: ignore
 from ApplicationServices import (  # type: ignore
     AXUIElementCreateApplication,
     AXUIElementPerformAction,
@@ -13,93 +33,65 @@ from ApplicationServices import (  # type: ignore
     AXUIElementPostKeyboardEvent,
 )
 
-SPACE = 49
-
-
-def get_frontmost() -> str:
-    ws = NSWorkspace.sharedWorkspace()
-    f = ws.frontmostApplication()
-    return f"{f.localizedName()} (pid={f.processIdentifier()})"
-
-
-def find_fl():
-    """Return (pid, bounds, owner) for FL Studio."""
-    ws = NSWorkspace.sharedWorkspace()
-    fl_pid = None
-    for app in ws.runningApplications():
-        name = app.localizedName() or ""
-        if "FL Studio" in name:
-            fl_pid = app.processIdentifier()
-            break
-    if fl_pid is None:
-        return None, None, None
-
-    opts = Quartz.kCGWindowListOptionOnScreenOnly | Quartz.kCGWindowListExcludeDesktopElements
-    wl = Quartz.CGWindowListCopyWindowInfo(opts, Quartz.kCGNullWindowID) or []
-    for w in wl:
-        owner = w.get("kCGWindowOwnerName", "")
-        if "FL Studio" not in owner:
-            continue
-        if int(w.get("kCGWindowLayer", 0)) != 0:
-            continue
-        b = w.get("kCGWindowBounds", {})
-        x, y = int(b.get("X", 0)), int(b.get("Y", 0))
-        ww, wh = int(b.get("Width", 0)), int(b.get("Height", 0))
-        if ww > 0 and wh > 0:
-            return fl_pid, (x, y, ww, wh), owner
-    return fl_pid, None, None
-
-
-def warp(x, y):
-    Quartz.CGWarpMouseCursorPosition(Quartz.CGPointMake(x, y))
-
-
-def cg_click(x, y, tap=Quartz.kCGHIDEventTap):
-    pt = Quartz.CGPointMake(x, y)
-    down = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseDown, pt, Quartz.kCGMouseButtonLeft)
-    up = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseUp, pt, Quartz.kCGMouseButtonLeft)
-    Quartz.CGEventPost(tap, down)
-    time.sleep(0.05)
-    Quartz.CGEventPost(tap, up)
-
-
-def cg_key(keycode, tap=Quartz.kCGHIDEventTap):
-    down = Quartz.CGEventCreateKeyboardEvent(None, keycode, True)
-    up = Quartz.CGEventCreateKeyboardEvent(None, keycode, False)
-    Quartz.CGEventPost(tap, down)
-    time.sleep(0.05)
-    Quartz.CGEventPost(tap, up)
+from _fl_locate import (
+    AX_KEY_HOLD_S,
+    EVENT_SRC,
+    KEY_HOLD_S,
+    SPACE,
+    cg_click,
+    cg_key,
+    get_frontmost,
+    hold,
+    hold_until,
+    resolve_fl,
+    running_apps,
+    warp_if_away,
+)
 
 
 def countdown(n=5):
-    for i in range(n, 0, -1):
+    # Each tick is due a whole number of seconds after the start, so print time
+    # never accumulates into drift.
+    start = time.monotonic()
+    for k, i in enumerate(range(n, 0, -1), 1):
         print(f"  {i}...")
-        time.sleep(1)
+        hold_until(start + k)
 
 
 # ── Methods ──────────────────────────────────────────────────────────────────
 
+def _run_method(send, sending="  >> Sending Space NOW...", sent="  SENT."):
+    """Shared tail of every method: countdown, send(), wait 4 s, report focus."""
+    countdown()
+    print(sending)
+    try:
+        send()
+        print(sent)
+    except Exception as e:
+        print(f"  ERROR: {e}")
+    time.sleep(4)
+    print(f"  Frontmost: {get_frontmost()}")
+
+
 def method_h(pid, bounds):
     """AXUIElementPostKeyboardEvent — keys direct to PID, NO FOCUS NEEDED."""
     print(f"Method H: AXUIElementPostKeyboardEvent to PID {pid}")
     print("  (Sends Space DIRECTLY to FL Studio — no focus change!)")
     ax_app = AXUIElementCreateApplication(pid)
-    countdown()
-    print("  >> Sending Space NOW...")
-    AXUIElementPostKeyboardEvent(ax_app, 0, SPACE, True)
-    time.sleep(0.02)
-    AXUIElementPostKeyboardEvent(ax_app, 0, SPACE, False)
-    print("  SENT. Watch FL Studio transport bar!")
-    time.sleep(4)
-    print(f"  Frontmost: {get_frontmost()}")
+
+    def send():
+        AXUIElementPostKeyboardEvent(ax_app, 0, SPACE, True)
+        hold(AX_KEY_HOLD_S)
+        AXUIElementPostKeyboardEvent(ax_app, 0, SPACE, False)
+
+    _run_method(send, sent="  SENT. Watch FL Studio transport bar!")
 
 
 def method_i(pid, bounds):
     """Dock bounce trick — activate Dock, then FL Studio, then CGEvent key."""
     print(f"Method I: Dock bounce activate + CGEvent Space")
-    ws = NSWorkspace.sharedWorkspace()
     dock = fl_app = None
-    for app in ws.runningApplications():
+    for app in running_apps():
         bid = app.bundleIdentifier() or ""
         if bid == "com.apple.dock":
             dock = app
@@ -119,30 +111,22 @@ def method_i(pid, bounds):
         time.sleep(0.5)
         print(f"  Frontmost after FL: {get_frontmost()}")
 
-    countdown()
-    print("  >> Sending Space NOW...")
-    cg_key(SPACE)
-    print("  SENT. Watch FL Studio!")
-    time.sleep(4)
-    print(f"  Frontmost: {get_frontmost()}")
+    _run_method(lambda: cg_key(SPACE), sent="  SENT. Watch FL Studio!")
 
 
 def method_j(pid, bounds):
     """CGEventPostToPid — post keyboard event directly to FL Studio PID."""
     print(f"Method J: CGEventPostToPid({pid}) Space")
-    countdown()
-    print("  >> Sending Space via CGEventPostToPid NOW...")
-    down = Quartz.CGEventCreateKeyboardEvent(None, SPACE, True)
-    up = Quartz.CGEventCreateKeyboardEvent(None, SPACE, False)
-    try:
+
+    def send():
+        down = Quartz.CGEventCreateKeyboardEvent(EVENT_SRC, SPACE, True)
         Quartz.CGEventPostToPid(pid, down)
-        time.sleep(0.05)
+        deadline = time.monotonic() + KEY_HOLD_S
+        up = Quartz.CGEventCreateKeyboardEvent(EVENT_SRC, SPACE, False)
+        hold_until(deadline)
         Quartz.CGEventPostToPid(pid, up)
-        print("  SENT.")
-    except Exception as e:
-        print(f"  ERROR: {e}")
-    time.sleep(4)
-    print(f"  Frontmost: {get_frontmost()}")
+
+    _run_method(send, sending="  >> Sending Space via CGEventPostToPid NOW...")
 
 
 def method_a(pid, bounds):
@@ -152,12 +136,7 @@ def method_a(pid, bounds):
     print(f"  open -a rc={r.returncode} err={r.stderr.strip()}")
     time.sleep(1.0)
     print(f"  Frontmost: {get_frontmost()}")
-    countdown()
-    print("  >> Sending Space NOW...")
-    cg_key(SPACE)
-    print("  SENT.")
-    time.sleep(4)
-    print(f"  Frontmost: {get_frontmost()}")
+    _run_method(lambda: cg_key(SPACE))
 
 
 def method_d(pid, bounds):
@@ -168,26 +147,18 @@ def method_d(pid, bounds):
     cx, cy = x + ww // 2, y + 50
     print(f"Method D: CGWarp + click at ({cx},{cy}) + Space")
 
-    print("  D1: HID tap click...")
-    warp(cx, cy)
-    time.sleep(0.1)
-    cg_click(cx, cy, Quartz.kCGHIDEventTap)
-    time.sleep(0.5)
-    print(f"  Frontmost after HID click: {get_frontmost()}")
-
-    print("  D2: Session tap click...")
-    warp(cx, cy)
-    time.sleep(0.1)
-    cg_click(cx, cy, Quartz.kCGSessionEventTap)
-    time.sleep(0.5)
-    print(f"  Frontmost after Session click: {get_frontmost()}")
+    for label, tap_name, tap in (
+        ("D1", "HID", Quartz.kCGHIDEventTap),
+        ("D2", "Session", Quartz.kCGSessionEventTap),
+    ):
+        print(f"  {label}: {tap_name} tap click...")
+        if warp_if_away(cx, cy):
+            time.sleep(0.1)
+        cg_click(cx, cy, tap)
+        time.sleep(0.5)
+        print(f"  Frontmost after {tap_name} click: {get_frontmost()}")
 
-    countdown()
-    print("  >> Sending Space NOW...")
-    cg_key(SPACE)
-    print("  SENT.")
-    time.sleep(4)
-    print(f"  Frontmost: {get_frontmost()}")
+    _run_method(lambda: cg_key(SPACE))
 
 
 METHODS = {
@@ -201,17 +172,11 @@ METHODS = {
 
 def main():
     if len(sys.argv) < 2 or sys.argv[1].upper() not in METHODS:
-        print(f"Usage: python {sys.argv[0]} <{'|'.join(METHODS)}>" )
-        print("  H = AXUIElementPostKeyboardEvent (HIGHEST CONFIDENCE)")
-        print("  I = Dock bounce activate trick")
-        print("  J = CGEventPostToPid")
-        print("  A = open -a + CGEvent key")
-        print("  D = CGWarp + click + key")
-        return 1
+        return usage()
 
     method = sys.argv[1].upper()
 
-    pid, bounds, owner = find_fl()
+    pid, bounds, owner = resolve_fl()
     if pid is None:
         print("ERROR: FL Studio not found!")
         return 1
@@ -10,9 +10,9 @@ Tests:
 """
 import subprocess
 import time
+from dataclasses import dataclass
 
 import Quartz  # type: ignore
-from AppKit import NSWorkspace, NSRunningApplication  # type: ignore
 from ApplicationServices import (  # type: ignore
     AXUIElementCreateApplication,
     AXUIElementPerformAction,
@@ -20,77 +20,32 @@ from ApplicationServices import (  # type: ignore
     AXUIElementPostKeyboardEvent,
 )
 
+from _fl_locate import (
+    AX_KEY_HOLD_S,
+    EVENT_SRC,
+    KEY_HOLD_S,
+    SPACE,
+    WORKSPACE,
+    cg_click,
+    cg_key,
+    confirm,
+    get_frontmost,
+    hold,
+    hold_until,
+    prompt,
+    resolve_fl,
+    running_apps,
+    warp,
+    warp_if_away,
+)
 
-# ── Helpers ──────────────────────────────────────────────────────────────────
-
-def get_frontmost() -> str:
-    ws = NSWorkspace.sharedWorkspace()
-    f = ws.frontmostApplication()
-    return f"{f.localizedName()} (pid={f.processIdentifier()})"
-
-
-def find_fl_pid() -> int | None:
-    ws = NSWorkspace.sharedWorkspace()
-    for app in ws.runningApplications():
-        name = app.localizedName() or ""
-        bid = app.bundleIdentifier() or ""
-        if "FL Studio" in name or "flstudio" in bid.lower():
-            return app.processIdentifier()
-    return None
-
-
-def find_fl_bounds():
-    opts = Quartz.kCGWindowListOptionOnScreenOnly | Quartz.kCGWindowListExcludeDesktopElements
-    wl = Quartz.CGWindowListCopyWindowInfo(opts, Quartz.kCGNullWindowID) or []
-    for w in wl:
-        owner = w.get("kCGWindowOwnerName", "")
-        if "FL Studio" not in owner:
-            continue
-        if int(w.get("kCGWindowLayer", 0)) != 0:
-            continue
-        b = w.get("kCGWindowBounds", {})
-        x, y = int(b.get("X", 0)), int(b.get("Y", 0))
-        ww, wh = int(b.get("Width", 0)), int(b.get("Height", 0))
-        if ww > 0 and wh > 0:
-            return (x, y, ww, wh), owner, int(w.get("kCGWindowOwnerPID", 0))
-    return None, None, None
-
-
-def warp(x, y):
-    Quartz.CGWarpMouseCursorPosition(Quartz.CGPointMake(x, y))
-
-
-def cg_click(x, y):
-    pt = Quartz.CGPointMake(x, y)
-    down = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseDown, pt, Quartz.kCGMouseButtonLeft)
-    up = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseUp, pt, Quartz.kCGMouseButtonLeft)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, down)
-    time.sleep(0.05)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, up)
-
-
-def cg_click_session(x, y):
-    """Click using kCGSessionEventTap instead of kCGHIDEventTap."""
-    pt = Quartz.CGPointMake(x, y)
-    down = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseDown, pt, Quartz.kCGMouseButtonLeft)
-    up = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseUp, pt, Quartz.kCGMouseButtonLeft)
-    Quartz.CGEventPost(Quartz.kCGSessionEventTap, down)
-    time.sleep(0.05)
-    Quartz.CGEventPost(Quartz.kCGSessionEventTap, up)
-
-
-def cg_key(keycode, tap=Quartz.kCGHIDEventTap):
-    down = Quartz.CGEventCreateKeyboardEvent(None, keycode, True)
-    up = Quartz.CGEventCreateKeyboardEvent(None, keycode, False)
-    Quartz.CGEventPost(tap, down)
-    time.sleep(0.05)
-    Quartz.CGEventPost(tap, up)
 
+# ── Helpers ──────────────────────────────────────────────────────────────────
 
 def cg_key_to_pid(keycode, pid):
     """Post key event targeted to a specific PID."""
-    down = Quartz.CGEventCreateKeyboardEvent(None, keycode, True)
-    up = Quartz.CGEventCreateKeyboardEvent(None, keycode, False)
+    down = Quartz.CGEventCreateKeyboardEvent(EVENT_SRC, keycode, True)
+    up = Quartz.CGEventCreateKeyboardEvent(EVENT_SRC, keycode, False)
     # Try kCGEventTargetUnixProcessID
     try:
         Quartz.CGEventSetIntegerValueField(down, Quartz.kCGEventTargetUnixProcessID, pid)
@@ -98,23 +53,32 @@ def cg_key_to_pid(keycode, pid):
     except Exception as e:
         print(f"    (CGEventSetIntegerValueField failed: {e})")
     Quartz.CGEventPost(Quartz.kCGHIDEventTap, down)
-    time.sleep(0.05)
+    hold(KEY_HOLD_S)
     Quartz.CGEventPost(Quartz.kCGHIDEventTap, up)
 
 
 def countdown(msg, n=3):
     print(msg)
-    for i in range(n, 0, -1):
+    # Each tick is due a whole number of seconds after the start, so print time
+    # never accumulates into drift.
+    start = time.monotonic()
+    for k, i in enumerate(range(n, 0, -1), 1):
         print(f"  {i}...")
-        time.sleep(1)
+        hold_until(start + k)
 
 
-SPACE = 49
+@dataclass(frozen=True)
+class Ctx:
+    """FL Studio handles resolved once in main() and shared by every test."""
+    pid: int
+    bounds: tuple[int, int, int, int]
+    fl_app: object | None  # NSRunningApplication
+    ax_app: object  # AXUIElement for the app
 
 
 # ── Tests ────────────────────────────────────────────────────────────────────
 
-def test_a_open_activate(fl_pid, bounds):
+def test_a_open_activate(ctx):
     """Method A: 'open -a' with correct name + CGEvent key."""
     print("\n╔══ Method A: open -a 'FL Studio' + CGEvent Space ══╗")
     r = subprocess.run(["open", "-a", "FL Studio"], capture_output=True, text=True)
@@ -125,33 +89,29 @@ def test_a_open_activate(fl_pid, bounds):
     cg_key(SPACE)
     print("  Space sent! Watch FL Studio transport.")
     time.sleep(3)
-    return input("  Did playback START? (y/n): ").strip().lower() == "y"
+    return confirm("  Did playback START? (y/n): ")
 
 
-def test_b_nsapp_activate(fl_pid, bounds):
+def test_b_nsapp_activate(ctx):
     """Method B: NSRunningApplication.activateWithOptions + CGEvent key."""
     print("\n╔══ Method B: NSRunningApplication activate + CGEvent Space ══╗")
-    ws = NSWorkspace.sharedWorkspace()
-    for app in ws.runningApplications():
-        if app.processIdentifier() == fl_pid:
-            # activateAllWindows + ignoreOtherApps
-            ok = app.activateWithOptions_(3)
-            print(f"  activateWithOptions: {ok}")
-            break
+    if ctx.fl_app is not None:
+        # activateAllWindows + ignoreOtherApps
+        ok = ctx.fl_app.activateWithOptions_(3)
+        print(f"  activateWithOptions: {ok}")
     time.sleep(1.0)
     print(f"  Frontmost: {get_frontmost()}")
     countdown("  Sending Space in", 2)
     cg_key(SPACE)
     print("  Space sent!")
     time.sleep(3)
-    return input("  Did playback START? (y/n): ").strip().lower() == "y"
+    return confirm("  Did playback START? (y/n): ")
 
 
-def test_c_axui_raise(fl_pid, bounds):
+def test_c_axui_raise(ctx):
     """Method C: AXUIElement raise window + CGEvent key."""
     print("\n╔══ Method C: AXUIElement raise + CGEvent Space ══╗")
-    ax_app = AXUIElementCreateApplication(fl_pid)
-    err, windows = AXUIElementCopyAttributeValue(ax_app, "AXWindows", None)
+    err, windows = AXUIElementCopyAttributeValue(ctx.ax_app, "AXWindows", None)
     if err == 0 and windows:
         print(f"  Found {len(windows)} AX windows")
         for w in windows:
@@ -166,19 +126,19 @@ def test_c_axui_raise(fl_pid, bounds):
     cg_key(SPACE)
     print("  Space sent!")
     time.sleep(3)
-    return input("  Did playback START? (y/n): ").strip().lower() == "y"
+    return confirm("  Did playback START? (y/n): ")
 
 
-def test_d_warp_click_key(fl_pid, bounds):
+def test_d_warp_click_key(ctx):
     """Method D: CGWarp + click (both HID and Session taps) + key."""
-    x, y, ww, wh = bounds
+    x, y, ww, wh = ctx.bounds
     cx, cy = x + ww // 2, y + 50  # top area, safe click target
     print(f"\n╔══ Method D: CGWarp + click at ({cx},{cy}) + Space ══╗")
 
     # Sub-test D1: HID tap click
     print("  D1: CGWarp + kCGHIDEventTap click...")
-    warp(cx, cy)
-    time.sleep(0.1)
+    if warp_if_away(cx, cy):
+        time.sleep(0.1)
     cg_click(cx, cy)
     time.sleep(0.5)
     front = get_frontmost()
@@ -186,9 +146,9 @@ def test_d_warp_click_key(fl_pid, bounds):
 
     # Sub-test D2: Session tap click
     print("  D2: CGWarp + kCGSessionEventTap click...")
-    warp(cx, cy)
-    time.sleep(0.1)
-    cg_click_session(cx, cy)
+    if warp_if_away(cx, cy):
+        time.sleep(0.1)
+    cg_click(cx, cy, Quartz.kCGSessionEventTap)
     time.sleep(0.5)
     front = get_frontmost()
     print(f"  Frontmost after Session click: {front}")
@@ -198,10 +158,10 @@ def test_d_warp_click_key(fl_pid, bounds):
     cg_key(SPACE)
     print("  Space sent!")
     time.sleep(3)
-    return input("  Did playback START? (y/n): ").strip().lower() == "y"
+    return confirm("  Did playback START? (y/n): ")
 
 
-def test_e_osascript(fl_pid, bounds):
+def test_e_osascript(ctx):
     """Method E: osascript activate + System Events key code."""
     print("\n╔══ Method E: osascript activate 'FL Studio' + System Events key ══╗")
     r = subprocess.run(
@@ -218,27 +178,28 @@ def test_e_osascript(fl_pid, bounds):
     )
     print(f"  key code 49: rc={r2.returncode} err={r2.stderr.strip()}")
     time.sleep(3)
-    return input("  Did playback START? (y/n): ").strip().lower() == "y"
+    return confirm("  Did playback START? (y/n): ")
 
 
-def test_f_key_to_pid(fl_pid, bounds):
+def test_f_key_to_pid(ctx):
     """Method F: CGEvent key targeted to FL Studio PID."""
-    print(f"\n╔══ Method F: CGEvent Space targeted to PID {fl_pid} ══╗")
+    print(f"\n╔══ Method F: CGEvent Space targeted to PID {ctx.pid} ══╗")
 
-    # First activate via open -a
-    subprocess.run(["open", "-a", "FL Studio"], capture_output=True)
+    # First activate through Launch Services in-process (what `open -a` does,
+    # minus the fork/exec of /usr/bin/open).
+    WORKSPACE.launchApplication_("FL Studio")
     time.sleep(0.5)
 
     countdown("  Sending PID-targeted Space in", 2)
-    cg_key_to_pid(SPACE, fl_pid)
+    cg_key_to_pid(SPACE, ctx.pid)
     print("  PID-targeted Space sent!")
     time.sleep(3)
-    return input("  Did playback START? (y/n): ").strip().lower() == "y"
+    return confirm("  Did playback START? (y/n): ")
 
 
-def test_g_associate_warp_click(fl_pid, bounds):
+def test_g_associate_warp_click(ctx):
     """Method G: CGAssociateMouseAndMouseCursorPosition + warp + click + key."""
-    x, y, ww, wh = bounds
+    x, y, ww, wh = ctx.bounds
     cx, cy = x + ww // 2, y + 50
     print(f"\n╔══ Method G: Associate + Warp + Click({cx},{cy}) + Space ══╗")
 
@@ -257,39 +218,31 @@ def test_g_associate_warp_click(fl_pid, bounds):
     cg_key(SPACE)
     print("  Space sent!")
     time.sleep(3)
-    return input("  Did playback START? (y/n): ").strip().lower() == "y"
+    return confirm("  Did playback START? (y/n): ")
 
 
-def test_h_axui_post_key(fl_pid, _bounds):
+def test_h_axui_post_key(ctx):
     """Method H: AXUIElementPostKeyboardEvent — keys direct to PID, NO FOCUS NEEDED."""
-    print(f"\n╔══ Method H: AXUIElementPostKeyboardEvent to PID {fl_pid} ══╗")
+    print(f"\n╔══ Method H: AXUIElementPostKeyboardEvent to PID {ctx.pid} ══╗")
     print("  (This sends keys DIRECTLY to FL Studio — no focus change needed!)")
 
-    ax_app = AXUIElementCreateApplication(fl_pid)
     countdown("  Sending Space via AXUIElement in", 2)
-    AXUIElementPostKeyboardEvent(ax_app, 0, SPACE, True)   # key down
-    time.sleep(0.02)
-    AXUIElementPostKeyboardEvent(ax_app, 0, SPACE, False)  # key up
+    AXUIElementPostKeyboardEvent(ctx.ax_app, 0, SPACE, True)   # key down
+    hold(AX_KEY_HOLD_S)
+    AXUIElementPostKeyboardEvent(ctx.ax_app, 0, SPACE, False)  # key up
     print("  AXUIElement Space sent!")
     time.sleep(3)
-    return input("  Did playback START? (y/n): ").strip().lower() == "y"
+    return confirm("  Did playback START? (y/n): ")
 
 
-def test_i_dock_bounce(fl_pid, _bounds):
+def test_i_dock_bounce(ctx):
     """Method I: Dock bounce trick — activate Dock, then FL Studio, then CGEvent key."""
     print(f"\n╔══ Method I: Dock bounce activate + CGEvent Space ══╗")
     print("  (Activates Dock first to force a real focus switch)")
 
-    ws = NSWorkspace.sharedWorkspace()
     # Find Dock
-    dock = None
-    fl_app = None
-    for app in ws.runningApplications():
-        bid = app.bundleIdentifier() or ""
-        if bid == "com.apple.dock":
-            dock = app
-        if app.processIdentifier() == fl_pid:
-            fl_app = app
+    dock = next((app for app in running_apps() if (app.bundleIdentifier() or "") == "com.apple.dock"), None)
+    fl_app = ctx.fl_app
 
     if dock:
         print("  Activating Dock...")
@@ -308,25 +261,26 @@ def test_i_dock_bounce(fl_pid, _bounds):
     cg_key(SPACE)
     print("  Space sent!")
     time.sleep(3)
-    return input("  Did playback START? (y/n): ").strip().lower() == "y"
+    return confirm("  Did playback START? (y/n): ")
 
 
-def test_j_cgevent_post_to_pid(fl_pid, _bounds):
+def test_j_cgevent_post_to_pid(ctx):
     """Method J: CGEventPostToPid — post keyboard event directly to FL Studio's PID."""
-    print(f"\n╔══ Method J: CGEventPostToPid({fl_pid}) Space ══╗")
+    print(f"\n╔══ Method J: CGEventPostToPid({ctx.pid}) Space ══╗")
 
     countdown("  Sending Space via CGEventPostToPid in", 2)
-    down = Quartz.CGEventCreateKeyboardEvent(None, SPACE, True)
-    up = Quartz.CGEventCreateKeyboardEvent(None, SPACE, False)
+    down = Quartz.CGEventCreateKeyboardEvent(EVENT_SRC, SPACE, True)
     try:
-        Quartz.CGEventPostToPid(fl_pid, down)
-        time.sleep(0.05)
-        Quartz.CGEventPostToPid(fl_pid, up)
+        Quartz.CGEventPostToPid(ctx.pid, down)
+        deadline = time.monotonic() + KEY_HOLD_S
+        up = Quartz.CGEventCreateKeyboardEvent(EVENT_SRC, SPACE, False)
+        hold_until(deadline)
+        Quartz.CGEventPostToPid(ctx.pid, up)
         print("  CGEventPostToPid Space sent!")
     except Exception as e:
         print(f"  CGEventPostToPid error: {e}")
     time.sleep(3)
-    return input("  Did playback START? (y/n): ").strip().lower() == "y"
+    return confirm("  Did playback START? (y/n): ")
 
 
 # ── Main ─────────────────────────────────────────────────────────────────────
@@ -334,17 +288,22 @@ def test_j_cgevent_post_to_pid(fl_pid, _bounds):
 def main():
     print("═══ Focus + Key Delivery v2 ═══\n")
 
-    fl_pid = find_fl_pid()
-    bounds_info, owner, win_pid = find_fl_bounds()
+    fl_pid, bounds_info, owner = resolve_fl()
     if fl_pid is None or bounds_info is None:
         print("ERROR: FL Studio not found!")
         return 1
 
     print(f"FL Studio: pid={fl_pid}, owner='{owner}', bounds={bounds_info}")
+    ctx = Ctx(
+        pid=fl_pid,
+        bounds=bounds_info,
+        fl_app=next((app for app in running_apps() if app.processIdentifier() == fl_pid), None),
+        ax_app=AXUIElementCreateApplication(fl_pid),
+    )
     print(f"Current frontmost: {get_frontmost()}")
     print("\nIMPORTANT: Between each test, press Space MANUALLY in FL Studio")
     print("to STOP playback if it started, so next test starts clean.\n")
-    input("Ready? Press Enter to begin... ")
+    prompt("Ready? Press Enter to begin... ", timeout=300.0, default="")
 
     results = {}
 
@@ -365,8 +324,8 @@ def main():
 
     for name, fn in tests:
         try:
-            ok = fn(fl_pid, bounds_info)
-            results[name] = "WORKS" if ok else "FAIL"
+            ok = fn(ctx)
+            results[name] = "TIMEOUT" if ok is None else "WORKS" if ok else "FAIL"
         except Exception as e:
             print(f"  ERROR: {e}")
             results[name] = f"ERROR: {e}"
@@ -374,7 +333,7 @@ def main():
         if results[name] == "WORKS":
             print(f"\n  >>> {name}: WORKS! <<<")
             print("  Stop playback manually, then press Enter.")
-            input()
+            prompt("", timeout=300.0, default="")
         print()
 
     print("\n═══ RESULTS ═══")
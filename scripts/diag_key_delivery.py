@@ -11,9 +11,10 @@ from __future__ import annotations
 import subprocess
 import time
 
-import pyautogui
 import Quartz  # type: ignore
 
+from _fl_locate import SPACE, cg_key, confirm, prompt
+
 
 def activate_fl() -> None:
     subprocess.run(["osascript", "-e", 'tell application "FL Studio 2024" to activate'],
@@ -21,9 +22,9 @@ def activate_fl() -> None:
     time.sleep(0.3)
 
 
-def method_a_pyautogui() -> None:
-    """Current approach — pyautogui.press() via CGEvent to kCGSessionEventTap."""
-    pyautogui.press("space")
+def method_a_cgevent_session() -> None:
+    """Raw CGEvent posted to kCGSessionEventTap; differs from C only in the tap."""
+    cg_key(SPACE, Quartz.kCGSessionEventTap)
 
 
 def method_b_applescript() -> None:
@@ -38,24 +39,19 @@ def method_b_applescript() -> None:
 
 def method_c_cgevent() -> None:
     """Raw CGEvent posted to kCGHIDEventTap (hardware-level simulation)."""
-    # key code 49 = Space
-    event_down = Quartz.CGEventCreateKeyboardEvent(None, 49, True)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, event_down)
-    time.sleep(0.05)
-    event_up = Quartz.CGEventCreateKeyboardEvent(None, 49, False)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, event_up)
+    cg_key(SPACE, Quartz.kCGHIDEventTap)
 
 
 def main() -> int:
     print("═══ FL Studio Key Delivery Diagnostic ═══\n")
     print("Make sure FL Studio is open and frontmost with a project loaded.")
     print("Watch the transport bar after each method — does playback start/stop?\n")
-    input("Press Enter when ready...")
+    prompt("Press Enter when ready...", timeout=300.0, default="")
 
-    results: dict[str, bool] = {}
+    results: dict[str, bool | None] = {}
 
     methods = [
-        ("A", "pyautogui.press('space')", method_a_pyautogui),
+        ("A", "CGEvent to kCGSessionEventTap (keycode 49)", method_a_cgevent_session),
         ("B", "AppleScript System Events key code 49", method_b_applescript),
         ("C", "CGEvent to kCGHIDEventTap (keycode 49)", method_c_cgevent),
     ]
@@ -67,10 +63,9 @@ def main() -> int:
         time.sleep(1.0)
         fn()
         time.sleep(0.3)
-        answer = input(f"  Did FL Studio respond? (y/n): ").strip().lower()
-        results[label] = answer == "y"
+        results[label] = confirm("  Did FL Studio respond? (y/n): ")
         # If playback started, send Space again to stop it before next test
-        if answer == "y":
+        if results[label]:
             print("  Sending Space again to stop playback...")
             activate_fl()
             time.sleep(0.3)
@@ -79,7 +74,8 @@ def main() -> int:
 
     print("\n═══ Results ═══")
     for label, desc, _ in methods:
-        status = "WORKS" if results[label] else "FAILED"
+        ok = results[label]
+        status = "TIMEOUT" if ok is None else "WORKS" if ok else "FAILED"
         print(f"  Method {label} ({desc}): {status}")
 
     winners = [l for l, ok in results.items() if ok]
@@ -3,21 +3,36 @@
 
 from __future__ import annotations
 
+import ctypes
 import os
 import platform
 import subprocess
 import sys
 
-from ApplicationServices import AXIsProcessTrusted  # type: ignore
-from Quartz import (  # type: ignore
-    CGPreflightListenEventAccess,
-    CGPreflightPostEventAccess,
-    CGPreflightScreenCaptureAccess,
-)
+
+# PROC_PIDPATHINFO_MAXSIZE from <sys/proc_info.h>.
+_PROC_PIDPATHINFO_MAXSIZE = 4096
+
+
+def _proc_pidpath(pid: int) -> str | None:
+    """Executable path of `pid` via libproc, or None if the call is unavailable."""
+    try:
+        libproc = ctypes.CDLL("/usr/lib/libproc.dylib")
+    except OSError:
+        return None
+    buf = ctypes.create_string_buffer(_PROC_PIDPATHINFO_MAXSIZE)
+    n = libproc.proc_pidpath(ctypes.c_int(pid), buf, ctypes.c_uint32(len(buf)))
+    if n <= 0:
+        return None
+    return buf.value.decode(errors="replace")
 
 
 def _parent_command() -> str:
     ppid = os.getppid()
+    # Ask the kernel directly; only fork ps when libproc can't answer.
+    path = _proc_pidpath(ppid)
+    if path:
+        return path
     try:
         result = subprocess.run(
             ["ps", "-o", "command=", "-p", str(ppid)],
@@ -35,6 +50,15 @@ def _parent_command() -> str:
 
 
 def main() -> int:
+    # PyObjC framework imports are the slow part of this script; load them only
+    # when the checks actually run, not when the module is imported.
+    from ApplicationServices import AXIsProcessTrusted  # type: ignore
+    from Quartz import (  # type: ignore
+        CGPreflightListenEventAccess,
+        CGPreflightPostEventAccess,
+        CGPreflightScreenCaptureAccess,
+    )
+
     post = bool(CGPreflightPostEventAccess())
     listen = bool(CGPreflightListenEventAccess())
     screen = bool(CGPreflightScreenCaptureAccess())
@@ -4,37 +4,26 @@ import time
 
 import Quartz  # type: ignore
 
+from _fl_locate import EVENT_SRC, cg_click, cg_key, wait_for_mouse
+
 
 def move_mouse_quartz(x: float, y: float) -> None:
     """Move mouse using raw CGEvent — bypass pyautogui."""
     point = Quartz.CGPointMake(x, y)
     event = Quartz.CGEventCreateMouseEvent(
-        None, Quartz.kCGEventMouseMoved, point, Quartz.kCGMouseButtonLeft
+        EVENT_SRC, Quartz.kCGEventMouseMoved, point, Quartz.kCGMouseButtonLeft
     )
     Quartz.CGEventPost(Quartz.kCGHIDEventTap, event)
 
 
 def click_quartz(x: float, y: float) -> None:
     """Click at (x, y) using raw CGEvent."""
-    point = Quartz.CGPointMake(x, y)
-    down = Quartz.CGEventCreateMouseEvent(
-        None, Quartz.kCGEventLeftMouseDown, point, Quartz.kCGMouseButtonLeft
-    )
-    up = Quartz.CGEventCreateMouseEvent(
-        None, Quartz.kCGEventLeftMouseUp, point, Quartz.kCGMouseButtonLeft
-    )
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, down)
-    time.sleep(0.05)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, up)
+    cg_click(x, y)
 
 
 def press_key_quartz(keycode: int) -> None:
     """Press a key using raw CGEvent."""
-    down = Quartz.CGEventCreateKeyboardEvent(None, keycode, True)
-    up = Quartz.CGEventCreateKeyboardEvent(None, keycode, False)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, down)
-    time.sleep(0.05)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, up)
+    cg_key(keycode)
 
 
 def get_mouse_pos() -> tuple[float, float]:
@@ -53,8 +42,7 @@ def main():
     # Test 1: Move mouse to center of main display
     print("\nTest 1: Moving mouse to (512, 384) via CGEvent...")
     move_mouse_quartz(512, 384)
-    time.sleep(0.3)
-    mx, my = get_mouse_pos()
+    mx, my = wait_for_mouse(512, 384)
     print(f"  Mouse now at: ({mx:.0f}, {my:.0f})")
     moved = abs(mx - 512) < 5 and abs(my - 384) < 5
     print(f"  Move successful: {moved}")
@@ -63,8 +51,7 @@ def main():
         print("\n  CGEvent mouse move also failed!")
         print("  Trying CGWarpMouseCursorPosition...")
         Quartz.CGWarpMouseCursorPosition(Quartz.CGPointMake(512, 384))
-        time.sleep(0.3)
-        mx, my = get_mouse_pos()
+        mx, my = wait_for_mouse(512, 384)
         print(f"  Mouse now at: ({mx:.0f}, {my:.0f})")
         moved = abs(mx - 512) < 5 and abs(my - 384) < 5
         print(f"  Warp successful: {moved}")
@@ -5,35 +5,28 @@ import time
 import Quartz  # type: ignore
 from AppKit import NSWorkspace  # type: ignore
 
+from _fl_locate import EVENT_SRC, cg_click, cg_key, hold_until, wait_for_mouse
+
 
 def warp_to(x: float, y: float) -> None:
     Quartz.CGWarpMouseCursorPosition(Quartz.CGPointMake(x, y))
 
 
 def click_at(x: float, y: float) -> None:
-    """Warp cursor then click at that position."""
+    """Warp cursor then click at that position.
+
+    A mouse-moved from the same source follows the warp so apps see the hover
+    before the down, in place of a fixed settle sleep.
+    """
     warp_to(x, y)
-    time.sleep(0.05)
     point = Quartz.CGPointMake(x, y)
-    down = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseDown, point, Quartz.kCGMouseButtonLeft)
-    up = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventLeftMouseUp, point, Quartz.kCGMouseButtonLeft)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, down)
-    time.sleep(0.05)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, up)
+    moved = Quartz.CGEventCreateMouseEvent(EVENT_SRC, Quartz.kCGEventMouseMoved, point, Quartz.kCGMouseButtonLeft)
+    Quartz.CGEventPost(Quartz.kCGHIDEventTap, moved)
+    cg_click(x, y)
 
 
 def press_key(keycode: int) -> None:
-    down = Quartz.CGEventCreateKeyboardEvent(None, keycode, True)
-    up = Quartz.CGEventCreateKeyboardEvent(None, keycode, False)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, down)
-    time.sleep(0.05)
-    Quartz.CGEventPost(Quartz.kCGHIDEventTap, up)
-
-
-def get_mouse_pos() -> tuple[float, float]:
-    event = Quartz.CGEventCreate(None)
-    point = Quartz.CGEventGetLocation(event)
-    return point.x, point.y
+    cg_key(keycode)
 
 
 def get_frontmost() -> str:
@@ -44,9 +37,12 @@ def get_frontmost() -> str:
 
 def countdown(msg: str, seconds: int = 3) -> None:
     print(msg)
-    for i in range(seconds, 0, -1):
+    # Each tick is due a whole number of seconds after the start, so print time
+    # never accumulates into drift.
+    start = time.monotonic()
+    for k, i in enumerate(range(seconds, 0, -1), 1):
         print(f"  {i}...")
-        time.sleep(1)
+        hold_until(start + k)
 
 
 def main():
@@ -59,8 +55,7 @@ def main():
     # Step 1: Warp mouse to FL Studio center
     print("\n>> Moving mouse to FL Studio window center (512, 384)...")
     warp_to(512, 384)
-    time.sleep(0.3)
-    mx, my = get_mouse_pos()
+    mx, my = wait_for_mouse(512, 384)
     print(f"   Mouse at: ({mx:.0f}, {my:.0f})")
 
     # Step 2: Click FL Studio to focus it
@@ -10,12 +10,12 @@ Deterministic pass/fail: scans events.jsonl for a key action containing "space"
 """
 from __future__ import annotations
 
-import json
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
+import json_compat
 from agent import run_agent
 from config import load_config
 
@@ -26,13 +26,19 @@ def _verify_space_in_events(session_id: int) -> bool:
     if not jsonl.exists():
         print(f"  FAIL: {jsonl} not found")
         return False
-    for line in jsonl.read_text().splitlines():
-        ev = json.loads(line)
-        inp = ev.get("tool_input", {})
-        if ev.get("tool") == "computer" and inp.get("action") == "key":
-            text = (inp.get("text") or "").lower()
-            if "space" in text and ev.get("ok"):
-                return True
+    # Stream the log and stop at the first hit. memory.encode_event writes with
+    # json.dumps' default separators, so a line without these bytes cannot match
+    # and is skipped without being parsed.
+    with jsonl.open("rb") as f:
+        for raw in f:
+            if b'"action": "key"' not in raw or b"space" not in raw.lower():
+                continue
+            ev = json_compat.loads(raw)
+            inp = ev.get("tool_input", {})
+            if ev.get("tool") == "computer" and inp.get("action") == "key":
+                text = (inp.get("text") or "").lower()
+                if "space" in text and ev.get("ok"):
+                    return True
     print(f"  FAIL: no successful key(space) event in {jsonl}")
     return False
 
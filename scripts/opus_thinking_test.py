@@ -87,6 +87,7 @@ def run_thinking_agent(
         display_width_px=cfg.display_width_px,
         display_height_px=cfg.display_height_px,
         enable_zoom=(computer_api_type == "computer_20251124"),
+        png_compress_level=cfg.png_compress_level,
     )
 
     paths = ensure_session(session_id)
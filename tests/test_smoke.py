@@ -1,14 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import io
 import os
 import json
 import tempfile
 import unittest
 from pathlib import Path
-
-from agent import build_system_prompt, _inject_prompt_caching
+from types import SimpleNamespace
+
+from PIL import Image
+
+from agent import build_system_prompt, _accumulate_usage, _inject_prompt_caching, _tool_result_block
+from computer_use import ToolResult
+from fl_state import (
+    extract_fl_state_from_image_async,
+    extract_fl_state_from_image_batch,
+    gather_bounded,
+    reference_content_blocks,
+    reset_reference_image_cache,
+    resolve_reference_images,
+)
 from learning import Lesson, load_relevant_lessons, store_lessons
-from memory import ensure_session, write_event
+from memory import EventWriter, encode_event, ensure_session, write_event, write_events
 from run_eval import evaluate_drum_run
 from self_improve import (
     SkillUpdate,
@@ -53,6 +68,140 @@ class AgentPromptTests(unittest.TestCase):
         )
         self.assertNotIn("cache_control", messages[0]["content"][-1])
 
+    def test_accumulate_usage_sums_known_fields(self) -> None:
+        totals = {"input": 0, "output": 0, "cache_read": 0, "cache_write": 0}
+        _accumulate_usage(totals, {"input_tokens": 10, "output_tokens": 4, "cache_read_input_tokens": None})
+        _accumulate_usage(totals, {"input_tokens": 5, "cache_creation_input_tokens": 7, "backend": "claude_print"})
+        self.assertEqual(totals, {"input": 15, "output": 4, "cache_read": 0, "cache_write": 7})
+
+    def test_tool_result_block_merges_output_and_error(self) -> None:
+        block = _tool_result_block("toolu_1", ToolResult(output="clicked", error="no change"))
+        self.assertEqual(block["content"], [{"type": "text", "text": "clicked\nERROR: no change"}])
+        self.assertTrue(block["is_error"])
+
+
+class FlStateTests(unittest.TestCase):
+    def test_reference_content_blocks_downscales_single_image(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            ref = Path(td) / "ref.png"
+            Image.new("RGB", (3000, 2000), "white").save(ref)
+            blocks, used = reference_content_blocks([ref])
+            self.assertEqual(used, [ref])
+            img = Image.open(io.BytesIO(base64.b64decode(blocks[1]["source"]["data"])))
+            self.assertEqual(img.size, (1024, 683))
+            self.assertEqual(reference_content_blocks([Path(td) / "missing.png"]), ([], []))
+
+            small = Path(td) / "small.png"
+            Image.new("RGB", (200, 100), "black").save(small)
+            blocks, _ = reference_content_blocks([small])
+            self.assertEqual(base64.b64decode(blocks[1]["source"]["data"]), small.read_bytes())
+
+    def test_reference_content_blocks_composes_single_strip(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            refs = []
+            for i, size in enumerate([(1200, 800), (600, 400), (900, 600)]):
+                ref = Path(td) / f"ref{i}.png"
+                Image.new("RGB", size, "white").save(ref)
+                refs.append(ref)
+            blocks, used = reference_content_blocks(refs + [Path(td) / "missing.png"])
+            self.assertEqual(used, refs)
+            self.assertEqual([b["type"] for b in blocks], ["text", "image"])
+            self.assertIn("3 examples", blocks[0]["text"])
+            strip = Image.open(io.BytesIO(base64.b64decode(blocks[1]["source"]["data"])))
+            self.assertLessEqual(strip.width, 1568)
+            self.assertGreater(strip.width, strip.height)
+
+            blocks, used = reference_content_blocks(refs[:1])
+            self.assertEqual(used, refs[:1])
+            self.assertEqual(blocks[0]["text"], f"reference_image={refs[0]}")
+
+    def test_reference_content_blocks_cache_returns_copies(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            ref = Path(td) / "ref.png"
+            Image.new("RGB", (64, 32), "white").save(ref)
+            first, _ = reference_content_blocks([ref])
+            first[1]["source"]["data"] = "mutated"
+            second, _ = reference_content_blocks([ref])
+            self.assertNotEqual(second[1]["source"]["data"], "mutated")
+
+    def test_resolve_reference_images_follows_env_override(self) -> None:
+        old = os.environ.get("CORTEX_FL_REFERENCE_IMAGE")
+        reset_reference_image_cache()
+        try:
+            with tempfile.TemporaryDirectory() as td:
+                ref = Path(td) / "ref.png"
+                Image.new("RGB", (8, 8)).save(ref)
+                os.environ["CORTEX_FL_REFERENCE_IMAGE"] = str(ref)
+                self.assertEqual(resolve_reference_images(), [ref])
+                ref.unlink()
+                # Cached for the same env value; recomputed once it changes.
+                self.assertEqual(resolve_reference_images(), [ref])
+                os.environ["CORTEX_FL_REFERENCE_IMAGE"] = str(Path(td) / "other.png")
+                self.assertNotIn(ref, resolve_reference_images())
+        finally:
+            if old is None:
+                os.environ.pop("CORTEX_FL_REFERENCE_IMAGE", None)
+            else:
+                os.environ["CORTEX_FL_REFERENCE_IMAGE"] = old
+            reset_reference_image_cache()
+
+    def test_extract_fl_state_batch_maps_results_by_custom_id(self) -> None:
+        submitted: list[dict] = []
+
+        def create(*, requests):
+            submitted.extend(requests)
+            return SimpleNamespace(id="b1", processing_status="ended")
+
+        ok = SimpleNamespace(
+            custom_id="s1",
+            result=SimpleNamespace(
+                type="succeeded",
+                message=SimpleNamespace(content=[{"type": "text", "text": '{"channel_rack_visible": true}'}]),
+            ),
+        )
+        failed = SimpleNamespace(custom_id="s2", result=SimpleNamespace(type="errored"))
+        batches = SimpleNamespace(create=create, retrieve=None, results=lambda _id: [ok, failed])
+        client = SimpleNamespace(messages=SimpleNamespace(batches=batches))
+
+        out = extract_fl_state_from_image_batch(
+            client=client,
+            model="m",
+            requests=[{"custom_id": "s1", "screenshot_b64": "AA=="}, {"custom_id": "s2", "screenshot_b64": "AA=="}],
+        )
+        self.assertEqual([r["custom_id"] for r in submitted], ["s1", "s2"])
+        self.assertEqual(submitted[0]["params"]["max_tokens"], 900)
+        self.assertTrue(out["s1"]["channel_rack_visible"])
+        self.assertEqual(out["s2"]["error"], "state_extraction_batch_failed")
+
+    def test_extract_fl_state_async_runs_bounded_concurrently(self) -> None:
+        in_flight = 0
+        peak = 0
+
+        async def create(**params):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if params["messages"][0]["content"][0]["text"].startswith("GOAL: boom"):
+                raise RuntimeError("api down")
+            return SimpleNamespace(content=[{"type": "text", "text": '{"channel_rack_visible": true}'}])
+
+        client = SimpleNamespace(messages=SimpleNamespace(create=create))
+        goals = ["a", "b", "boom", "c", "d"]
+        results = asyncio.run(
+            gather_bounded(
+                (
+                    extract_fl_state_from_image_async(client=client, model="m", screenshot_b64="AA==", goal=g)
+                    for g in goals
+                ),
+                concurrency=2,
+            )
+        )
+        self.assertEqual(peak, 2)
+        self.assertIsInstance(results[2], RuntimeError)
+        self.assertTrue(all(r["channel_rack_visible"] for i, r in enumerate(results) if i != 2))
+
 
 class MemoryTests(unittest.TestCase):
     def test_ensure_session_and_write_event(self) -> None:
@@ -72,6 +221,20 @@ class MemoryTests(unittest.TestCase):
             finally:
                 os.chdir(cwd)
 
+    def test_event_writer_appends_after_existing_events(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            jsonl_path = Path(tmp) / "events.jsonl"
+            write_event(jsonl_path, {"step": 0})
+            with EventWriter(jsonl_path) as writer:
+                writer.write({"step": 1})
+                writer.write(encode_event({"step": 2, "ts": 5.0}))
+            self.assertEqual(write_events(jsonl_path, [{"step": 3}, encode_event({"step": 4})]), 2)
+            self.assertEqual(write_events(jsonl_path, []), 0)
+            rows = [json.loads(line) for line in jsonl_path.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([r["step"] for r in rows], [0, 1, 2, 3, 4])
+            self.assertIn("ts", rows[1])
+            self.assertEqual(rows[2]["ts"], 5.0)
+
     def test_ensure_session_resets_previous_artifacts(self) -> None:
         cwd = Path.cwd()
         with tempfile.TemporaryDirectory() as tmp: